@@ -3,9 +3,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from database import engine, Base, SessionLocal
+from migrations import run_migrations
 from models import Category
 from routes import school_years, classes, pupils, categories, entries
-from routes import reports, export
+from routes import reports, export, analytics
+from services.rendering import shutdown_render_pool, warm_up_render_pool, RENDER_WARMUP
+from services.jobs import (
+    shutdown_job_executor, cleanup_expired_jobs, fail_interrupted_jobs, start_job_heartbeat
+)
 
 app = FastAPI(
     title="Pupil Development Tracker",
@@ -29,6 +34,7 @@ app.include_router(categories.router, prefix="/categories", tags=["Categories"])
 app.include_router(entries.router, prefix="/entries", tags=["Entries"])
 app.include_router(reports.router, prefix="/reports", tags=["Reports"])
 app.include_router(export.router, tags=["Export/Import"])
+app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
 
 
 PREDEFINED_CATEGORIES = [
@@ -57,11 +63,33 @@ def seed_categories():
         db.close()
 
 
+def recover_report_jobs():
+    """Fail jobs interrupted by a restart and drop expired results."""
+    db = SessionLocal()
+    try:
+        fail_interrupted_jobs(db)
+        cleanup_expired_jobs(db)
+    finally:
+        db.close()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and seed data on startup."""
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     seed_categories()
+    recover_report_jobs()
+    start_job_heartbeat(SessionLocal)
+    if RENDER_WARMUP:
+        warm_up_render_pool()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Stop background workers."""
+    shutdown_job_executor()
+    shutdown_render_pool()
 
 
 @app.get("/")
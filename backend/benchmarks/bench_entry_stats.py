@@ -0,0 +1,64 @@
+"""Benchmark aggregate reads from entries against the entry_stats summary.
+
+Usage: python benchmarks/bench_entry_stats.py [--entries 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from common import create_bench_engine, populate, timeit
+from migrations import rebuild_entry_stats, run_migrations
+
+QUERIES = {
+    "class overview": (
+        "SELECT p.id, e.category_id, count(e.id), max(e.date) FROM pupils p "
+        "LEFT JOIN entries e ON e.pupil_id = p.id WHERE p.class_id = 7 "
+        "GROUP BY p.id, e.category_id",
+        "SELECT p.id, s.category_id, s.entry_count, s.last_date FROM pupils p "
+        "LEFT JOIN entry_stats s ON s.pupil_id = p.id WHERE p.class_id = 7",
+    ),
+    "counts per category": (
+        "SELECT category_id, count(*) FROM entries GROUP BY category_id",
+        "SELECT category_id, sum(entry_count) FROM entry_stats GROUP BY category_id",
+    ),
+    "pupils without recent entry": (
+        "SELECT p.id FROM pupils p LEFT JOIN entries e ON e.pupil_id = p.id "
+        "GROUP BY p.id HAVING coalesce(max(e.date), '') < '2025-09-01'",
+        "SELECT p.id FROM pupils p LEFT JOIN entry_stats s ON s.pupil_id = p.id "
+        "GROUP BY p.id HAVING coalesce(max(s.last_date), '') < '2025-09-01'",
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_entry_stats.db")
+    engine = create_bench_engine(path)
+    run_migrations(engine)
+    t0 = time.perf_counter()
+    populate(engine, args.entries)
+    print(f"insert {args.entries:,} entries with triggers: {time.perf_counter() - t0:.1f} s")
+    with engine.begin() as conn:
+        t0 = time.perf_counter()
+        rebuild_entry_stats(conn)
+        print(f"rebuild entry_stats: {time.perf_counter() - t0:.1f} s")
+        conn.execute(text("ANALYZE"))
+
+    print(f"{'(median ms)':30} {'entries':>10} {'entry_stats':>12}")
+    with engine.connect() as conn:
+        for name, (raw, summary) in QUERIES.items():
+            raw_ms = timeit(lambda: conn.execute(text(raw)).all(), 5)
+            summary_ms = timeit(lambda: conn.execute(text(summary)).all(), 5)
+            print(f"{name:30} {raw_ms:10.2f} {summary_ms:12.2f}")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark grade analytics over a whole school year.
+
+The default of 150,000 entries is a busy school year of 1,000 pupils.
+
+Usage: python benchmarks/bench_grade_analytics.py [--entries 150000]
+"""
+import argparse
+import os
+import tempfile
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from common import create_bench_engine, populate, timeit
+from migrations import run_migrations
+from routes.analytics import grade_analytics
+
+QUERIES = {
+    "school year": {"school_year_id": 1},
+    "school year by class": {"school_year_id": 1, "group_by": "class"},
+    "school year by subject": {"school_year_id": 1, "group_by": "subject"},
+    "one class by category": {"class_id": 7, "group_by": "category"},
+    "one term": {"start_date": "2024-09-01", "end_date": "2025-01-31"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=150_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_grade_analytics.db")
+    engine = create_bench_engine(path)
+    populate(engine, args.entries)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    print(f"{args.entries:,} entries (median ms)")
+    with Session(engine) as db:
+        for name, params in QUERIES.items():
+            params = {"school_year_id": None, "class_id": None, "category_id": None,
+                      "subject": None, "start_date": None, "end_date": None,
+                      "group_by": None, **params}
+            print(f"{name:25} {timeit(lambda: grade_analytics(db=db, **params), 5):8.1f}")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
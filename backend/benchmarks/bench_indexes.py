@@ -0,0 +1,74 @@
+"""Benchmark report and list queries with and without the hot-path indexes.
+
+Usage: python benchmarks/bench_indexes.py [--entries 1000000]
+"""
+import argparse
+import os
+import tempfile
+from datetime import date
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from common import create_bench_engine, populate, timeit
+from migrations import run_migrations
+from models import Class, Pupil, Entry
+
+HOT_PATH_INDEXES = [
+    "ix_entries_pupil_id_date",
+    "ix_entries_category_id_pupil_id",
+    "ix_pupils_class_id",
+    "ix_classes_school_year_id",
+]
+
+
+def run_queries(engine, n_pupils: int) -> dict:
+    """Time the queries behind the report and list endpoints."""
+    with Session(engine) as db:
+        pupil_id = n_pupils // 2
+        return {
+            "report (pupil + date range)": timeit(lambda: db.query(Entry).filter(
+                Entry.pupil_id == pupil_id,
+                Entry.date >= date(2024, 9, 1),
+                Entry.date <= date(2025, 7, 31)).all()),
+            "list entries?pupil_id": timeit(lambda: db.query(Entry).filter(
+                Entry.pupil_id == pupil_id).all()),
+            "list entries?category_id&pupil_id": timeit(lambda: db.query(Entry).filter(
+                Entry.category_id == 3, Entry.pupil_id == pupil_id).all()),
+            "list pupils?class_id": timeit(lambda: db.query(Pupil).filter(
+                Pupil.class_id == 7).all()),
+            "pupils of school year": timeit(lambda: db.query(Pupil).join(Class).filter(
+                Class.school_year_id == 1).count()),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_indexes.db")
+    engine = create_bench_engine(path)
+    n_pupils = populate(engine, args.entries)
+
+    with engine.begin() as conn:
+        for name in HOT_PATH_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text("ANALYZE"))
+    before = run_queries(engine, n_pupils)
+
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = run_queries(engine, n_pupils)
+
+    print(f"{args.entries:,} entries, {n_pupils:,} pupils (median ms)")
+    print(f"{'query':40} {'before':>10} {'after':>10}")
+    for name in before:
+        print(f"{name:40} {before[name]:10.2f} {after[name]:10.2f}")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
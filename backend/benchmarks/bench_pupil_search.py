@@ -0,0 +1,64 @@
+"""Benchmark typeahead pupil search on a school-sized set of names.
+
+Usage: python benchmarks/bench_pupil_search.py [--pupils 12000]
+"""
+import argparse
+import os
+import random
+import tempfile
+
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from common import create_bench_engine, populate, timeit
+from migrations import run_migrations
+from models import Pupil
+from services.search import search_pupils
+
+FIRST_NAMES = ["Anna", "Ben", "Clara", "David", "Emma", "Finn", "Greta", "Jörg", "Jonas",
+               "Lea", "Lukas", "Marie", "Max", "Mia", "Noah", "Paul", "Sophie", "Tim"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner",
+              "Becker", "Schulz", "Hoffmann", "Schäfer", "Koch", "Bauer", "Richter",
+              "Klein", "Wolf", "Schröder", "Neumann", "Schwarz", "Zimmermann", "Braun",
+              "Krüger", "Hofmann", "Hartmann", "Lange", "Weiß", "Krause", "Lehmann"]
+
+QUERIES = {
+    "one letter": {"q": "m"},
+    "prefix": {"q": "schr"},
+    "umlaut spelling": {"q": "Mueller"},
+    "first and last name": {"q": "max mül"},
+    "typo": {"q": "Zimermann"},
+    "typo, first and last name": {"q": "Lukas Shmidt"},
+    "prefix, one class": {"q": "schr", "class_id": 42},
+    "prefix, school year": {"q": "schr", "school_year_id": 1},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pupils", type=int, default=12_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_pupil_search.db")
+    engine = create_bench_engine(path)
+    n_pupils = populate(engine, 0, n_classes=args.pupils // 25)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(
+            update(Pupil).where(Pupil.id == bindparam("pupil_id"))
+            .values(first_name=bindparam("first"), last_name=bindparam("last")),
+            [{"pupil_id": p, "first": rng.choice(FIRST_NAMES), "last": rng.choice(LAST_NAMES)}
+             for p in range(1, n_pupils + 1)]
+        )
+    run_migrations(engine)
+
+    print(f"{n_pupils:,} pupils (median ms, top 10)")
+    with Session(engine) as db:
+        for name, params in QUERIES.items():
+            print(f"{name:25} {timeit(lambda: search_pupils(db, **params)):8.2f}")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
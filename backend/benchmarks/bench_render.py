@@ -0,0 +1,48 @@
+"""Benchmark per-report PDF and DOCX render time by report size.
+
+Usage: python benchmarks/bench_render.py [--repeat 5]
+"""
+import argparse
+
+from common import timeit
+from services.pdf_generator import generate_pdf_report
+from services.word_generator import generate_word_report
+
+SIZES = [10, 100, 1000]
+N_CATEGORIES = 8
+
+
+def make_report_data(n_entries: int) -> dict:
+    """Return synthetic report data with n_entries spread over the categories."""
+    entries_by_category = {}
+    for i in range(n_entries):
+        entries_by_category.setdefault(f"Category {i % N_CATEGORIES}", []).append({
+            "date": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+            "text": "Arbeitet konzentriert mit und hilft anderen Kindern beim Lesen.",
+            "grade": str(i % 6 + 1) if i % 3 == 0 else None,
+            "subject": "Deutsch",
+        })
+    return {"pupil_id": 1, "pupil_name": "Max Mustermann", "class_name": "1A",
+            "start_date": "2024-09-01", "end_date": "2025-07-31",
+            "entries_by_category": entries_by_category}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Build the per-process renderers outside the timed region.
+    generate_pdf_report(make_report_data(1))
+    generate_word_report(make_report_data(1))
+
+    print(f"{'entries':>8} {'pdf ms':>10} {'docx ms':>10}")
+    for size in SIZES:
+        data = make_report_data(size)
+        pdf_ms = timeit(lambda: generate_pdf_report(data), repeat=args.repeat)
+        docx_ms = timeit(lambda: generate_word_report(data), repeat=args.repeat)
+        print(f"{size:>8} {pdf_ms:10.1f} {docx_ms:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark full-text entry search on a database with realistic entry texts.
+
+Usage: python benchmarks/bench_search.py [--entries 1000000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import Session
+
+from common import create_bench_engine, populate, timeit
+from migrations import run_migrations
+from services.search import SEARCH_CANDIDATES, search_entries
+
+COMMON_WORDS = [
+    "arbeitet", "heute", "im", "Unterricht", "sehr", "gut", "mit", "der", "Gruppe",
+    "konzentriert", "hilft", "anderen", "Kindern", "beim", "Lesen", "Rechnen",
+    "Schreiben", "Pause", "Hausaufgaben", "vergessen", "Streit", "Mitschüler",
+    "Aufgaben", "selbstständig", "erledigt", "Fortschritte", "Wortschatz", "Sport",
+]
+
+
+def make_text(rng, n: int) -> str:
+    """Return an observation built from common words and a few rare ones."""
+    words = rng.choices(COMMON_WORDS, k=rng.randint(5, 10))
+    words += [f"wort{rng.randint(0, 50_000)}" for _ in range(2)]
+    return " ".join(words)
+
+
+QUERIES = {
+    "rare word": {"q": "wort12345"},
+    "common word": {"q": "Streit"},
+    "two words, prefix": {"q": "Streit Pau"},
+    "umlaut spelling": {"q": "Mitschueler vergessen"},
+    "common word, one class": {"q": "Streit", "class_id": 7},
+    "common word, one pupil": {"q": "Streit", "pupil_id": 123},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), "bench_search.db")
+    engine = create_bench_engine(path)
+    populate(engine, args.entries, make_text=make_text)
+    t0 = time.perf_counter()
+    run_migrations(engine)
+    print(f"{args.entries:,} entries, index backfill {time.perf_counter() - t0:.1f} s, "
+          f"{SEARCH_CANDIDATES:,} candidates ranked")
+
+    print(f"{'query':30} {'matches':>10} {'median ms':>10}")
+    with Session(engine) as db:
+        for name, params in QUERIES.items():
+            matches = len(search_entries(db, limit=args.entries, candidates=args.entries, **params))
+            elapsed = timeit(lambda: search_entries(db, **params), repeat=5)
+            print(f"{name:30} {matches:10,} {elapsed:10.2f}")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Shared helpers for the benchmark scripts."""
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+from database import Base, create_db_engine
+from models import SchoolYear, Class, Pupil, Category, Entry
+
+CHUNK_SIZE = 50_000
+
+
+def create_bench_engine(path: str):
+    """Create a fresh benchmark database at the given path."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return engine
+
+
+def populate(engine, n_entries: int, n_classes: int = 40, pupils_per_class: int = 25,
+             n_categories: int = 8, seed: int = 42, make_text=None):
+    """Fill the database with synthetic school data.
+
+    make_text(rng, n) returns the text of entry n; by default a unique label.
+    """
+    rng = random.Random(seed)
+    start = date(2018, 9, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(SchoolYear), [
+            {"id": 1, "name": "2018/2026", "start_date": start,
+             "end_date": date(2026, 7, 31), "is_active": True}
+        ])
+        conn.execute(insert(Class), [
+            {"id": c, "name": f"Class {c}", "school_year_id": 1}
+            for c in range(1, n_classes + 1)
+        ])
+        conn.execute(insert(Pupil), [
+            {"id": p, "first_name": f"First{p}", "last_name": f"Last{p}",
+             "class_id": (p - 1) // pupils_per_class + 1}
+            for p in range(1, n_classes * pupils_per_class + 1)
+        ])
+        conn.execute(insert(Category), [
+            {"id": c, "name_de": f"Kategorie {c}", "name_en": f"Category {c}",
+             "is_predefined": True}
+            for c in range(1, n_categories + 1)
+        ])
+    n_pupils = n_classes * pupils_per_class
+    for offset in range(0, n_entries, CHUNK_SIZE):
+        rows = [
+            {"pupil_id": rng.randint(1, n_pupils),
+             "category_id": rng.randint(1, n_categories),
+             "date": start + timedelta(days=rng.randint(0, 2800)),
+             "text": make_text(rng, offset + i) if make_text else f"Observation {offset + i}",
+             "grade": rng.choice([None, "1", "2", "2-", "3+", "4"]),
+             "subject": rng.choice([None, "Mathe", "Deutsch", "Sachkunde"])}
+            for i in range(min(CHUNK_SIZE, n_entries - offset))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(Entry), rows)
+    return n_pupils
+
+
+def timeit(fn, repeat: int = 20) -> float:
+    """Return the median wall time of fn in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
@@ -1,12 +1,60 @@
 """Database connection setup for the Pupil Development Tracker."""
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./pupil_tracker.db"
+DATABASE_URL = os.environ.get("PUPIL_TRACKER_DATABASE_URL", "sqlite:///./pupil_tracker.db")
+
+POOL_SIZE = int(os.environ.get("PUPIL_TRACKER_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.environ.get("PUPIL_TRACKER_DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.environ.get("PUPIL_TRACKER_DB_POOL_TIMEOUT", "30"))
+
+# Connection pragmas applied to every new SQLite connection.
+BUSY_TIMEOUT_MS = int(os.environ.get("PUPIL_TRACKER_DB_BUSY_TIMEOUT_MS", "5000"))
+MMAP_SIZE = int(os.environ.get("PUPIL_TRACKER_DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+CACHE_SIZE_KIB = int(os.environ.get("PUPIL_TRACKER_DB_CACHE_SIZE_KIB", "65536"))
+
+
+def is_memory_url(url: str) -> bool:
+    """Return True if the URL points to an in-memory SQLite database."""
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure a fresh SQLite connection for concurrent access."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KIB}")
+    finally:
+        cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, **kwargs):
+    """Create an engine for the given URL using the production profile."""
+    if not url.startswith("sqlite"):
+        kwargs.setdefault("pool_size", POOL_SIZE)
+        kwargs.setdefault("max_overflow", MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", POOL_TIMEOUT)
+        return create_engine(url, **kwargs)
+
+    connect_args = {"check_same_thread": False, "timeout": BUSY_TIMEOUT_MS / 1000}
+    connect_args.update(kwargs.pop("connect_args", {}))
+    if not is_memory_url(url) and "poolclass" not in kwargs:
+        kwargs.setdefault("pool_size", POOL_SIZE)
+        kwargs.setdefault("max_overflow", MAX_OVERFLOW)
+        kwargs.setdefault("pool_timeout", POOL_TIMEOUT)
+    new_engine = create_engine(url, connect_args=connect_args, **kwargs)
+    event.listen(new_engine, "connect", set_sqlite_pragmas)
+    return new_engine
+
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
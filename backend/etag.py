@@ -0,0 +1,70 @@
+"""Conditional GET support backed by the data_versions counters."""
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from models import DataVersion
+
+# Headers paginate() sets before the ETag check of a paged list.
+PAGE_HEADERS = ("X-Next-Cursor", "Link")
+
+
+def get_data_version(db: Session, scope: str, key: int = 0) -> int:
+    """Return the current version of one data_versions counter, 0 if never bumped."""
+    version = db.scalar(
+        select(DataVersion.version).where(DataVersion.scope == scope, DataVersion.key == key)
+    )
+    return version or 0
+
+
+def make_etag(request: Request, scope: str, key: int, version: int) -> str:
+    """Return a weak ETag for a resource URL at a data version."""
+    url = f"{request.url.path}?{request.url.query}"
+    digest = hashlib.sha1(url.encode()).hexdigest()[:16]
+    return f'W/"{scope}-{key}-{version}-{digest}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Return True if an If-None-Match header matches etag (weak comparison)."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def current_etag(request: Request, db: Session, scope: str, key: int = 0,
+                 version: Optional[int] = None) -> str:
+    """Return the ETag of a GET response, reading the version unless the caller knows it."""
+    if version is None:
+        version = get_data_version(db, scope, key)
+    return make_etag(request, scope, key, version)
+
+
+def respond_not_modified(request: Request, response: Response, etag: str):
+    """Set the ETag of a GET response, or raise 304 if the client's copy is current.
+
+    Paging headers already set on the response are repeated on the 304,
+    since they describe the page the client has cached.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        headers = {"ETag": etag}
+        headers.update(
+            (name, response.headers[name]) for name in PAGE_HEADERS if name in response.headers
+        )
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers["ETag"] = etag
+
+
+def check_not_modified(request: Request, response: Response, db: Session,
+                       scope: str, key: int = 0, version: Optional[int] = None):
+    """Set the ETag of a GET response, or raise 304 if the client's copy is current.
+
+    Only the data_versions row is read, or nothing if the caller already
+    knows the version, so an unchanged resource is answered without
+    running its query or serializing it.
+    """
+    respond_not_modified(request, response, current_etag(request, db, scope, key, version))
@@ -0,0 +1,334 @@
+"""Idempotent schema migrations applied at startup."""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from database import Base
+import models  # noqa: F401  (registers tables on Base.metadata)
+from services.grades import grade_value_sql
+from services.search import NAME_FOLDS
+
+
+# Columns added to existing tables after their first release.
+ADDED_COLUMNS = {"report_jobs": ["owner", "heartbeat_at"]}
+
+# Indexes replaced by a differently shaped one under a new name.
+DROPPED_INDEXES = ["ix_entries_pupil_id_grade_value"]
+
+
+def ensure_columns(bind: Engine):
+    """Add columns missing from an existing database."""
+    tables = set(inspect(bind).get_table_names())
+    with bind.begin() as conn:
+        for table_name, names in ADDED_COLUMNS.items():
+            if table_name not in tables:
+                continue
+            existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+            for name in names:
+                if name not in existing:
+                    column = Base.metadata.tables[table_name].c[name]
+                    conn.execute(text(
+                        f"ALTER TABLE {table_name} ADD COLUMN {name} "
+                        f"{column.type.compile(dialect=bind.dialect)}"
+                    ))
+        if "entries" in tables:
+            columns = {column["name"] for column in inspect(conn).get_columns("entries")}
+            if "grade_value" not in columns:
+                conn.execute(text(
+                    "ALTER TABLE entries ADD COLUMN grade_value FLOAT "
+                    f"GENERATED ALWAYS AS ({grade_value_sql('grade')}) VIRTUAL"
+                ))
+
+
+def ensure_indexes(bind: Engine):
+    """Create any model indexes missing from an existing database and drop replaced ones."""
+    with bind.begin() as conn:
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    existing_tables = set(inspect(bind).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
+def bump_version_sql(scope: str, key: str) -> str:
+    """Return an upsert that increments one data_versions counter."""
+    return (
+        f"INSERT INTO data_versions (scope, key, version) VALUES ('{scope}', {key}, 1) "
+        f"ON CONFLICT (scope, key) DO UPDATE SET version = version + 1;"
+    )
+
+
+# Triggers keeping data_versions current for every write path,
+# including bulk statements and imports that bypass the ORM.
+VERSION_TRIGGERS = {
+    "trg_entries_version_insert": ("AFTER INSERT ON entries", [
+        bump_version_sql("pupil", "NEW.pupil_id"),
+    ]),
+    "trg_entries_version_update": ("AFTER UPDATE ON entries", [
+        bump_version_sql("pupil", "OLD.pupil_id"),
+        bump_version_sql("pupil", "NEW.pupil_id"),
+    ]),
+    "trg_entries_version_delete": ("AFTER DELETE ON entries", [
+        bump_version_sql("pupil", "OLD.pupil_id"),
+    ]),
+    # Insert and delete count too, so a reused pupil id gets a new version.
+    "trg_pupils_version_insert": ("AFTER INSERT ON pupils", [
+        bump_version_sql("pupil", "NEW.id"),
+    ]),
+    "trg_pupils_version_update": ("AFTER UPDATE ON pupils", [
+        bump_version_sql("pupil", "NEW.id"),
+    ]),
+    "trg_pupils_version_delete": ("AFTER DELETE ON pupils", [
+        bump_version_sql("pupil", "OLD.id"),
+    ]),
+    "trg_classes_version_update": ("AFTER UPDATE ON classes", [
+        bump_version_sql("class", "NEW.id"),
+    ]),
+    "trg_categories_version_insert": ("AFTER INSERT ON categories", [
+        bump_version_sql("categories", "0"),
+    ]),
+    "trg_categories_version_update": ("AFTER UPDATE ON categories", [
+        bump_version_sql("categories", "0"),
+    ]),
+    "trg_categories_version_delete": ("AFTER DELETE ON categories", [
+        bump_version_sql("categories", "0"),
+    ]),
+}
+
+# Table-wide counters behind conditional GETs; categories is covered above.
+for _table in ("school_years", "classes", "pupils", "entries"):
+    for _event in ("INSERT", "UPDATE", "DELETE"):
+        VERSION_TRIGGERS[f"trg_{_table}_table_version_{_event.lower()}"] = (
+            f"AFTER {_event} ON {_table}", [bump_version_sql(_table, "0")]
+        )
+
+
+# Full-text index over entry text and subject. It is an external-content
+# table, so the text is stored once in entries; unicode61 with
+# remove_diacritics folds umlauts (ä -> a) and case.
+ENTRIES_FTS_SQL = (
+    "CREATE VIRTUAL TABLE entries_fts USING fts5("
+    "text, subject, content='entries', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+FTS_DELETE_SQL = (
+    "INSERT INTO entries_fts (entries_fts, rowid, text, subject) "
+    "VALUES ('delete', OLD.id, OLD.text, OLD.subject);"
+)
+FTS_INSERT_SQL = (
+    "INSERT INTO entries_fts (rowid, text, subject) VALUES (NEW.id, NEW.text, NEW.subject);"
+)
+
+SEARCH_TRIGGERS = {
+    "trg_entries_fts_insert": ("AFTER INSERT ON entries", [FTS_INSERT_SQL]),
+    "trg_entries_fts_update": ("AFTER UPDATE OF text, subject ON entries",
+                               [FTS_DELETE_SQL, FTS_INSERT_SQL]),
+    "trg_entries_fts_delete": ("AFTER DELETE ON entries", [FTS_DELETE_SQL]),
+}
+
+
+def fold_name_sql(column: str) -> str:
+    """Return SQL that normalizes a name like services.search.fold_name."""
+    expr = f"lower({column})"
+    for source, target in NAME_FOLDS:
+        expr = f"replace({expr}, '{source}', '{target}')"
+    return expr
+
+
+# pupil_name_keys holds normalized names for prefix range scans;
+# pupils_fts indexes the same rows by trigram for substring and fuzzy search.
+PUPILS_FTS_SQL = (
+    "CREATE VIRTUAL TABLE pupils_fts USING fts5(first_key, last_key, "
+    "content='pupil_name_keys', content_rowid='pupil_id', tokenize='trigram')"
+)
+
+PUPIL_KEYS_FTS_DELETE_SQL = (
+    "INSERT INTO pupils_fts (pupils_fts, rowid, first_key, last_key) "
+    "SELECT 'delete', pupil_id, first_key, last_key FROM pupil_name_keys "
+    "WHERE pupil_id = OLD.id;"
+)
+PUPIL_KEYS_FTS_INSERT_SQL = (
+    "INSERT INTO pupils_fts (rowid, first_key, last_key) "
+    "SELECT pupil_id, first_key, last_key FROM pupil_name_keys WHERE pupil_id = NEW.id;"
+)
+PUPIL_KEYS_UPSERT_SQL = (
+    "INSERT OR REPLACE INTO pupil_name_keys (pupil_id, first_key, last_key) "
+    f"VALUES (NEW.id, {fold_name_sql('NEW.first_name')}, {fold_name_sql('NEW.last_name')});"
+)
+
+PUPIL_SEARCH_TRIGGERS = {
+    "trg_pupils_search_insert": ("AFTER INSERT ON pupils", [
+        PUPIL_KEYS_UPSERT_SQL, PUPIL_KEYS_FTS_INSERT_SQL,
+    ]),
+    "trg_pupils_search_update": ("AFTER UPDATE OF first_name, last_name ON pupils", [
+        PUPIL_KEYS_FTS_DELETE_SQL, PUPIL_KEYS_UPSERT_SQL, PUPIL_KEYS_FTS_INSERT_SQL,
+    ]),
+    "trg_pupils_search_delete": ("AFTER DELETE ON pupils", [
+        PUPIL_KEYS_FTS_DELETE_SQL, "DELETE FROM pupil_name_keys WHERE pupil_id = OLD.id;",
+    ]),
+}
+
+
+def graded_key_sql(row: str) -> str:
+    """Return SQL for an entry's "date id grade" key, NULL if it has no grade."""
+    return (f"CASE WHEN {row}grade IS NOT NULL "
+            f"THEN printf('%s %012d %s', {row}date, {row}id, {row}grade) END")
+
+
+# Length of the "date id " prefix in front of the grade in a graded key.
+GRADED_KEY_PREFIX = len("2024-01-01 000000000001 ")
+
+ENTRY_STATS_COLUMNS = (
+    "pupil_id, category_id, entry_count, first_date, last_date, last_graded, last_grade"
+)
+
+
+def entry_stats_insert_sql(where: str = "") -> str:
+    """Return SQL that computes entry_stats rows from the entries matching where."""
+    return (
+        f"INSERT INTO entry_stats ({ENTRY_STATS_COLUMNS}) "
+        f"SELECT pupil_id, category_id, n, first_date, last_date, graded, "
+        f"substr(graded, {GRADED_KEY_PREFIX + 1}) FROM ("
+        f"SELECT pupil_id, category_id, count(*) AS n, min(date) AS first_date, "
+        f"max(date) AS last_date, max({graded_key_sql('')}) AS graded "
+        f"FROM entries {where} GROUP BY pupil_id, category_id);"
+    )
+
+
+ENTRY_STATS_UPSERT_SQL = (
+    f"INSERT INTO entry_stats ({ENTRY_STATS_COLUMNS}) "
+    f"VALUES (NEW.pupil_id, NEW.category_id, 1, NEW.date, NEW.date, "
+    f"{graded_key_sql('NEW.')}, NEW.grade) "
+    "ON CONFLICT (pupil_id, category_id) DO UPDATE SET "
+    "entry_count = entry_count + 1, "
+    "first_date = min(first_date, excluded.first_date), "
+    "last_date = max(last_date, excluded.last_date), "
+    "last_graded = CASE WHEN excluded.last_graded > coalesce(last_graded, '') "
+    "THEN excluded.last_graded ELSE last_graded END, "
+    "last_grade = CASE WHEN excluded.last_graded > coalesce(last_graded, '') "
+    "THEN excluded.last_grade ELSE last_grade END;"
+)
+
+
+def entry_stats_remove_sql() -> list:
+    """Return SQL taking the OLD entry out of its entry_stats row.
+
+    The count is lowered in place. A bound is only looked up again in
+    entries if OLD was on it: its first or last date, or its latest grade.
+    """
+    group = "pupil_id = OLD.pupil_id AND category_id = OLD.category_id"
+    latest = f"{graded_key_sql('OLD.')} >= last_graded"
+    graded = f"(SELECT max({graded_key_sql('')}) FROM entries WHERE {group})"
+    return [
+        f"DELETE FROM entry_stats WHERE {group} AND entry_count = 1;",
+        "UPDATE entry_stats SET entry_count = entry_count - 1, "
+        "first_date = CASE WHEN OLD.date <= first_date "
+        f"THEN (SELECT min(date) FROM entries WHERE {group}) ELSE first_date END, "
+        "last_date = CASE WHEN OLD.date >= last_date "
+        f"THEN (SELECT max(date) FROM entries WHERE {group}) ELSE last_date END, "
+        f"last_graded = CASE WHEN {latest} THEN {graded} ELSE last_graded END, "
+        f"last_grade = CASE WHEN {latest} "
+        f"THEN substr({graded}, {GRADED_KEY_PREFIX + 1}) ELSE last_grade END "
+        f"WHERE {group};",
+    ]
+
+
+# An update adds NEW before taking out OLD, so a row that stays in its
+# group never drops the group's entry_stats row on the way.
+ENTRY_STATS_TRIGGERS = {
+    "trg_entry_stats_insert": ("AFTER INSERT ON entries", [ENTRY_STATS_UPSERT_SQL]),
+    "trg_entry_stats_update": ("AFTER UPDATE OF pupil_id, category_id, date, grade ON entries", [
+        ENTRY_STATS_UPSERT_SQL, *entry_stats_remove_sql(),
+    ]),
+    "trg_entry_stats_delete": ("AFTER DELETE ON entries", entry_stats_remove_sql()),
+}
+
+
+def create_triggers(conn, triggers: dict):
+    """Create the given triggers, replacing existing ones whose SQL has changed."""
+    existing = dict(conn.execute(text(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'trigger'"
+    )).all())
+    for name, (event, statements) in triggers.items():
+        body = "\n    ".join(statements)
+        sql = f"CREATE TRIGGER {name} {event} FOR EACH ROW\nBEGIN\n    {body}\nEND"
+        if existing.get(name) == sql:
+            continue
+        if name in existing:
+            conn.execute(text(f"DROP TRIGGER {name}"))
+        conn.execute(text(sql))
+
+
+def ensure_search_index(bind: Engine):
+    """Create the entry and pupil search indexes and their triggers, backfilling them once."""
+    tables = set(inspect(bind).get_table_names())
+    with bind.begin() as conn:
+        if "entries" in tables:
+            if "entries_fts" not in tables:
+                conn.execute(text(ENTRIES_FTS_SQL))
+                conn.execute(text("INSERT INTO entries_fts (entries_fts) VALUES ('rebuild')"))
+            create_triggers(conn, SEARCH_TRIGGERS)
+        if {"pupils", "pupil_name_keys"} <= tables:
+            if "pupils_fts" not in tables:
+                conn.execute(text(PUPILS_FTS_SQL))
+                conn.execute(text(
+                    "INSERT OR REPLACE INTO pupil_name_keys (pupil_id, first_key, last_key) "
+                    f"SELECT id, {fold_name_sql('first_name')}, {fold_name_sql('last_name')} "
+                    "FROM pupils"
+                ))
+                conn.execute(text("INSERT INTO pupils_fts (pupils_fts) VALUES ('rebuild')"))
+            create_triggers(conn, PUPIL_SEARCH_TRIGGERS)
+
+
+def rebuild_entry_stats(conn):
+    """Recompute every entry_stats row from entries."""
+    conn.execute(text("DELETE FROM entry_stats"))
+    conn.execute(text(entry_stats_insert_sql()))
+
+
+def ensure_entry_stats(bind: Engine):
+    """Create the entry_stats triggers, backfilling the table once."""
+    tables = set(inspect(bind).get_table_names())
+    if not {"entries", "entry_stats"} <= tables:
+        return
+    with bind.begin() as conn:
+        missing = conn.execute(text(
+            "SELECT NOT EXISTS (SELECT 1 FROM entry_stats) AND EXISTS (SELECT 1 FROM entries)"
+        )).scalar()
+        if missing:
+            rebuild_entry_stats(conn)
+        create_triggers(conn, ENTRY_STATS_TRIGGERS)
+
+
+def ensure_triggers(bind: Engine):
+    """Create the data version triggers if they are missing."""
+    with bind.begin() as conn:
+        create_triggers(conn, VERSION_TRIGGERS)
+
+
+def run_migrations(bind: Engine):
+    """Bring an existing database up to the current schema."""
+    ensure_columns(bind)
+    ensure_indexes(bind)
+    ensure_search_index(bind)
+    ensure_entry_stats(bind)
+    ensure_triggers(bind)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the database.")
+    parser.add_argument("--rebuild-entry-stats", action="store_true",
+                        help="recompute the entry_stats summary table from entries")
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    if args.rebuild_entry_stats:
+        with engine.begin() as conn:
+            rebuild_entry_stats(conn)
@@ -1,10 +1,11 @@
 """SQLAlchemy models for the Pupil Development Tracker."""
-from datetime import date
+from datetime import date, datetime
 from sqlalchemy import (
-    Column, Integer, String, Date, Boolean, Text, ForeignKey
+    Column, Computed, Float, Integer, String, Date, DateTime, Boolean, Text, ForeignKey, Index, text
 )
 from sqlalchemy.orm import relationship
 from database import Base
+from services.grades import grade_value_sql
 
 
 class SchoolYear(Base):
@@ -26,7 +27,7 @@ class Class(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50), nullable=False)
-    school_year_id = Column(Integer, ForeignKey("school_years.id"))
+    school_year_id = Column(Integer, ForeignKey("school_years.id"), index=True)
 
     school_year = relationship("SchoolYear", back_populates="classes")
     pupils = relationship("Pupil", back_populates="class_")
@@ -39,7 +40,7 @@ class Pupil(Base):
     id = Column(Integer, primary_key=True, index=True)
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
-    class_id = Column(Integer, ForeignKey("classes.id"))
+    class_id = Column(Integer, ForeignKey("classes.id"), index=True)
 
     class_ = relationship("Class", back_populates="pupils")
     entries = relationship("Entry", back_populates="pupil")
@@ -60,6 +61,14 @@ class Category(Base):
 class Entry(Base):
     """Model for pupil entries."""
     __tablename__ = "entries"
+    __table_args__ = (
+        Index("ix_entries_pupil_id_date", "pupil_id", "date"),
+        Index("ix_entries_category_id_pupil_id", "category_id", "pupil_id"),
+        Index("ix_entries_date_id", "date", "id"),
+        # Partial, so only queries on graded entries (analytics) can use it.
+        Index("ix_entries_graded_pupil_id", "pupil_id", "grade_value", "date", "category_id",
+              sqlite_where=text("grade_value IS NOT NULL")),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     pupil_id = Column(Integer, ForeignKey("pupils.id"), nullable=False)
@@ -68,6 +77,63 @@ class Entry(Base):
     text = Column(Text, nullable=False)
     grade = Column(String(10), nullable=True)
     subject = Column(String(100), nullable=True)
+    # Numeric value of grade (2- is 2.3), computed by SQLite on every write.
+    grade_value = Column(Float, Computed(grade_value_sql("grade"), persisted=False))
 
     pupil = relationship("Pupil", back_populates="entries")
     category = relationship("Category", back_populates="entries")
+
+
+class DataVersion(Base):
+    """Model for change counters, bumped by triggers on every write."""
+    __tablename__ = "data_versions"
+
+    scope = Column(String(20), primary_key=True)
+    key = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class PupilNameKey(Base):
+    """Model for normalized pupil names used by typeahead search, kept by triggers."""
+    __tablename__ = "pupil_name_keys"
+
+    pupil_id = Column(Integer, primary_key=True)
+    first_key = Column(String(100), nullable=False, index=True)
+    last_key = Column(String(100), nullable=False, index=True)
+
+
+class EntryStat(Base):
+    """Model for per-pupil, per-category entry aggregates, kept by triggers."""
+    __tablename__ = "entry_stats"
+
+    pupil_id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    entry_count = Column(Integer, nullable=False)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    last_grade = Column(String(10), nullable=True)
+    # "date id grade" of the latest graded entry; sorts by date, then id.
+    last_graded = Column(String(40), nullable=True)
+
+
+class ReportJob(Base):
+    """Model for background report rendering jobs."""
+    __tablename__ = "report_jobs"
+
+    id = Column(String(32), primary_key=True)
+    format = Column(String(10), nullable=False)
+    pupil_id = Column(Integer, nullable=True)
+    class_id = Column(Integer, nullable=True)
+    start_date = Column(Date, nullable=True)
+    end_date = Column(Date, nullable=True)
+    status = Column(String(20), nullable=False, default="queued", index=True)
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=1)
+    filename = Column(String(255), nullable=True)
+    result_path = Column(String(500), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Process that renders the job and when it last confirmed it is alive.
+    owner = Column(String(32), nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
@@ -0,0 +1,78 @@
+"""Keyset pagination helpers for list endpoints."""
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import Date, tuple_
+from sqlalchemy.orm import Query
+
+from etag import respond_not_modified
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: list) -> str:
+    """Encode keyset values into an opaque cursor string."""
+    payload = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_value(key, value):
+    """Convert one decoded cursor value to the type of its key column."""
+    if isinstance(key.type, Date):
+        return date.fromisoformat(value)
+    if type(value) is not key.type.python_type:
+        raise ValueError(value)
+    return value
+
+
+def decode_cursor(cursor: str, keys: list) -> list:
+    """Decode a cursor into keyset values typed like the key columns."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [decode_value(key, v) for key, v in zip(keys, values)]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Query,
+    keys: list,
+    request: Request,
+    response: Response,
+    limit: Optional[int],
+    cursor: Optional[str],
+    etag: Optional[str] = None
+) -> list:
+    """Return one keyset page of query, or every row if no page is requested.
+
+    When more rows follow, the cursor of the next page is sent in the
+    X-Next-Cursor header and as a rel="next" Link header. If an etag is
+    given, a 304 is raised instead of returning rows the client has; for
+    a page this happens after it is read, so the 304 keeps its headers.
+    """
+    if limit is None and cursor is None:
+        if etag:
+            respond_not_modified(request, response, etag)
+        return query.all()
+    limit = limit or DEFAULT_PAGE_SIZE
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.filter(tuple_(*keys) > tuple_(*values))
+    rows = query.order_by(*keys).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([getattr(rows[-1], key.key) for key in keys])
+        next_url = request.url.include_query_params(limit=limit, cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    if etag:
+        respond_not_modified(request, response, etag)
+    return rows
@@ -0,0 +1,126 @@
+"""Routes for grade analytics."""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, List, Literal, Optional, Union
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from database import get_db
+from models import Class, Entry, Pupil
+from services.grades import summarize
+
+router = APIRouter()
+
+GROUP_COLUMNS = {
+    "class": Pupil.class_id,
+    "category": Entry.category_id,
+    "subject": Entry.subject,
+}
+
+
+class GradeSummary(BaseModel):
+    """Schema for the distribution of a set of grades."""
+    count: int
+    mean: Optional[float]
+    p25: Optional[float]
+    median: Optional[float]
+    p75: Optional[float]
+    histogram: Dict[int, int]
+
+
+class GradeTrendPoint(BaseModel):
+    """Schema for the grades of one month."""
+    month: str
+    count: int
+    mean: float
+
+
+class GradeGroup(BaseModel):
+    """Schema for the grades of one class, category or subject."""
+    key: Union[int, str, None]
+    summary: GradeSummary
+    trend: List[GradeTrendPoint]
+
+
+class GradeAnalyticsResponse(BaseModel):
+    """Schema for grade analytics response."""
+    summary: GradeSummary
+    trend: List[GradeTrendPoint]
+    groups: List[GradeGroup]
+
+
+def grade_accumulator():
+    """Return empty grade value -> count and month -> [count, sum of grades] maps."""
+    return defaultdict(int), defaultdict(lambda: [0, 0.0])
+
+
+def trend_points(months: Dict[str, list]) -> List[GradeTrendPoint]:
+    """Turn month -> [count, sum of grades] into trend points, oldest first."""
+    return [
+        GradeTrendPoint(month=month, count=count, mean=round(total / count, 2))
+        for month, (count, total) in sorted(months.items())
+    ]
+
+
+@router.get("/grades", response_model=GradeAnalyticsResponse)
+def grade_analytics(
+    school_year_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    subject: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    group_by: Optional[Literal["class", "category", "subject"]] = None,
+    db: Session = Depends(get_db)
+):
+    """Get grade distribution, mean, quartiles and monthly trend of the matching entries.
+
+    Only entries whose grade maps to a number are counted. Grades are
+    aggregated in SQL per value and month, so Python only sees a few rows
+    per group.
+    """
+    conditions = [Entry.grade_value.isnot(None)]
+    if class_id is not None:
+        conditions.append(Pupil.class_id == class_id)
+    if school_year_id is not None:
+        conditions.append(
+            Pupil.class_id.in_(select(Class.id).where(Class.school_year_id == school_year_id))
+        )
+    if category_id is not None:
+        conditions.append(Entry.category_id == category_id)
+    if subject is not None:
+        conditions.append(Entry.subject == subject)
+    if start_date is not None:
+        conditions.append(Entry.date >= start_date)
+    if end_date is not None:
+        conditions.append(Entry.date <= end_date)
+    month = func.strftime("%Y-%m", Entry.date)
+    keys = [GROUP_COLUMNS[group_by]] if group_by else []
+
+    rows = db.execute(
+        select(*keys or [literal(None)], month, Entry.grade_value, func.count())
+        .select_from(Entry).join(Pupil, Pupil.id == Entry.pupil_id)
+        .where(*conditions)
+        .group_by(*keys, month, Entry.grade_value)
+    )
+    totals, groups = grade_accumulator(), defaultdict(grade_accumulator)
+    for group, row_month, value, count in rows:
+        for value_counts, months in (totals, groups[group]):
+            value_counts[value] += count
+            months[row_month][0] += count
+            months[row_month][1] += value * count
+
+    return GradeAnalyticsResponse(
+        summary=summarize(list(totals[0].items())),
+        trend=trend_points(totals[1]),
+        groups=[
+            GradeGroup(key=group, summary=summarize(list(value_counts.items())),
+                       trend=trend_points(months))
+            for group, (value_counts, months) in sorted(
+                groups.items(), key=lambda item: (item[0] is None, item[0])
+            )
+        ] if group_by else [],
+    )
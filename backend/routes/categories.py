@@ -1,12 +1,15 @@
 """Routes for categories management."""
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import Category
+from etag import check_not_modified, current_etag, respond_not_modified
+from pagination import paginate, MAX_PAGE_SIZE
+from services.reference_cache import category_cache
 
 router = APIRouter()
 
@@ -35,23 +38,42 @@ def create_category(data: CategoryCreate, db: Session = Depends(get_db)):
     category = Category(**data.model_dump())
     db.add(category)
     db.commit()
+    category_cache.invalidate()
     db.refresh(category)
     return category
 
 
 @router.get("", response_model=List[CategoryResponse])
-def get_categories(predefined_only: bool = False, db: Session = Depends(get_db)):
-    """Get all categories, optionally filtered to predefined only."""
+def get_categories(
+    request: Request,
+    response: Response,
+    predefined_only: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get categories, optionally filtered to predefined only and paged by id.
+
+    Unpaged requests are served from the in-process category cache.
+    """
+    snapshot = category_cache.snapshot(db)
+    etag = current_etag(request, db, "categories", version=snapshot.version)
+    if limit is None and cursor is None:
+        respond_not_modified(request, response, etag)
+        return [row for row in snapshot.rows if row.is_predefined or not predefined_only]
     query = db.query(Category)
     if predefined_only:
         query = query.filter(Category.is_predefined == True)
-    return query.all()
+    return paginate(query, [Category.id], request, response, limit, cursor, etag)
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-def get_category(category_id: int, db: Session = Depends(get_db)):
+def get_category(category_id: int, request: Request, response: Response,
+                 db: Session = Depends(get_db)):
     """Get a category by ID."""
-    category = db.query(Category).filter(Category.id == category_id).first()
+    snapshot = category_cache.snapshot(db)
+    check_not_modified(request, response, db, "categories", version=snapshot.version)
+    category = snapshot.by_id.get(category_id)
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
     return category
@@ -66,6 +88,7 @@ def update_category(category_id: int, data: CategoryCreate, db: Session = Depend
     for key, value in data.model_dump().items():
         setattr(category, key, value)
     db.commit()
+    category_cache.invalidate()
     db.refresh(category)
     return category
 
@@ -80,4 +103,5 @@ def delete_category(category_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=403, detail="Cannot delete predefined category")
     db.delete(category)
     db.commit()
+    category_cache.invalidate()
     return None
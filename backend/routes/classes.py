@@ -1,12 +1,16 @@
 """Routes for classes management."""
-from typing import List, Optional
+from datetime import date
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
+from sqlalchemy import Date, String, insert, literal, select
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import Class
+from models import Class, Pupil, Category, Entry, EntryStat, SchoolYear
+from etag import check_not_modified, current_etag
+from pagination import paginate, MAX_PAGE_SIZE
 
 router = APIRouter()
 
@@ -27,9 +31,51 @@ class ClassResponse(BaseModel):
         from_attributes = True
 
 
+class ClassEntryBroadcast(BaseModel):
+    """Schema for an entry recorded for every pupil of a class."""
+    category_id: int
+    date: date
+    text: str
+    grade: Optional[str] = None
+    subject: Optional[str] = None
+    include_pupil_ids: Optional[List[int]] = None
+    exclude_pupil_ids: Optional[List[int]] = None
+
+
+class ClassEntryBroadcastResponse(BaseModel):
+    """Schema for class-wide entry creation response."""
+    created: int
+    entry_ids: List[int]
+
+
+class PupilOverview(BaseModel):
+    """Schema for one pupil's row in the class overview."""
+    pupil_id: int
+    first_name: str
+    last_name: str
+    entry_counts: Dict[int, int]
+    total_entries: int
+    last_entry_date: Optional[date]
+    latest_grade: Optional[str]
+
+
+class ClassOverviewResponse(BaseModel):
+    """Schema for class overview response."""
+    class_id: int
+    class_name: str
+    pupils: List[PupilOverview]
+
+
+def check_school_year(db: Session, school_year_id: int):
+    """Raise 404 if the class's school year does not exist."""
+    if not db.get(SchoolYear, school_year_id):
+        raise HTTPException(status_code=404, detail="School year not found")
+
+
 @router.post("", response_model=ClassResponse, status_code=status.HTTP_201_CREATED)
 def create_class(data: ClassCreate, db: Session = Depends(get_db)):
     """Create a new class."""
+    check_school_year(db, data.school_year_id)
     class_ = Class(**data.model_dump())
     db.add(class_)
     db.commit()
@@ -38,17 +84,116 @@ def create_class(data: ClassCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[ClassResponse])
-def get_classes(school_year_id: Optional[int] = None, db: Session = Depends(get_db)):
-    """Get all classes, optionally filtered by school year."""
+def get_classes(
+    request: Request,
+    response: Response,
+    school_year_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get classes, optionally filtered by school year and paged by id."""
+    etag = current_etag(request, db, "classes")
     query = db.query(Class)
     if school_year_id:
         query = query.filter(Class.school_year_id == school_year_id)
-    return query.all()
+    return paginate(query, [Class.id], request, response, limit, cursor, etag)
+
+
+@router.post("/{class_id}/entries", response_model=ClassEntryBroadcastResponse,
+             status_code=status.HTTP_201_CREATED)
+def create_class_entries(class_id: int, data: ClassEntryBroadcast,
+                         db: Session = Depends(get_db)):
+    """Record the same entry for every pupil of a class with one INSERT ... SELECT.
+
+    include_pupil_ids restricts the entry to those pupils of the class,
+    exclude_pupil_ids skips the given pupils.
+    """
+    if data.include_pupil_ids is not None and data.exclude_pupil_ids is not None:
+        raise HTTPException(status_code=400,
+                            detail="Pass either include_pupil_ids or exclude_pupil_ids")
+    if not db.query(Class.id).filter(Class.id == class_id).first():
+        raise HTTPException(status_code=404, detail="Class not found")
+    if not db.query(Category.id).filter(Category.id == data.category_id).first():
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    pupils = select(
+        Pupil.id,
+        literal(data.category_id),
+        literal(data.date, Date),
+        literal(data.text, String),
+        literal(data.grade, String),
+        literal(data.subject, String),
+    ).where(Pupil.class_id == class_id)
+    if data.include_pupil_ids is not None:
+        pupils = pupils.where(Pupil.id.in_(data.include_pupil_ids))
+    if data.exclude_pupil_ids:
+        pupils = pupils.where(Pupil.id.not_in(data.exclude_pupil_ids))
+    stmt = insert(Entry).from_select(
+        ["pupil_id", "category_id", "date", "text", "grade", "subject"], pupils
+    ).returning(Entry.id)
+    entry_ids = list(db.scalars(stmt))
+    db.commit()
+    return ClassEntryBroadcastResponse(created=len(entry_ids), entry_ids=entry_ids)
+
+
+@router.get("/{class_id}/overview", response_model=ClassOverviewResponse)
+def get_class_overview(
+    class_id: int,
+    inactive_since: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Get every pupil of a class with entry counts per category, last date and latest grade.
+
+    Read from the entry_stats summary, so the cost grows with the number of
+    pupils, not entries. With inactive_since only pupils without an entry
+    on or after that date are returned.
+    """
+    class_ = db.query(Class).filter(Class.id == class_id).first()
+    if not class_:
+        raise HTTPException(status_code=404, detail="Class not found")
+    rows = db.execute(
+        select(Pupil.id, Pupil.first_name, Pupil.last_name, EntryStat.category_id,
+               EntryStat.entry_count, EntryStat.last_date, EntryStat.last_graded,
+               EntryStat.last_grade)
+        .outerjoin(EntryStat, EntryStat.pupil_id == Pupil.id)
+        .where(Pupil.class_id == class_id)
+        .order_by(Pupil.last_name, Pupil.first_name, Pupil.id)
+    )
+    pupils = {}
+    for pupil_id, first_name, last_name, category_id, count, last_date, graded, grade in rows:
+        overview = pupils.get(pupil_id)
+        if overview is None:
+            overview = pupils[pupil_id] = {
+                "pupil_id": pupil_id, "first_name": first_name, "last_name": last_name,
+                "entry_counts": {}, "total_entries": 0, "last_entry_date": None,
+                "latest_grade": None, "latest_graded": "",
+            }
+        if category_id is None:
+            continue
+        overview["entry_counts"][category_id] = count
+        overview["total_entries"] += count
+        if overview["last_entry_date"] is None or last_date > overview["last_entry_date"]:
+            overview["last_entry_date"] = last_date
+        if graded and graded > overview["latest_graded"]:
+            overview["latest_graded"] = graded
+            overview["latest_grade"] = grade
+    if inactive_since is not None:
+        pupils = {
+            pupil_id: overview for pupil_id, overview in pupils.items()
+            if overview["last_entry_date"] is None or overview["last_entry_date"] < inactive_since
+        }
+    return ClassOverviewResponse(
+        class_id=class_.id, class_name=class_.name,
+        pupils=[PupilOverview(**overview) for overview in pupils.values()]
+    )
 
 
 @router.get("/{class_id}", response_model=ClassResponse)
-def get_class(class_id: int, db: Session = Depends(get_db)):
+def get_class(class_id: int, request: Request, response: Response,
+              db: Session = Depends(get_db)):
     """Get a class by ID."""
+    check_not_modified(request, response, db, "classes")
     class_ = db.query(Class).filter(Class.id == class_id).first()
     if not class_:
         raise HTTPException(status_code=404, detail="Class not found")
@@ -61,6 +206,7 @@ def update_class(class_id: int, data: ClassCreate, db: Session = Depends(get_db)
     class_ = db.query(Class).filter(Class.id == class_id).first()
     if not class_:
         raise HTTPException(status_code=404, detail="Class not found")
+    check_school_year(db, data.school_year_id)
     for key, value in data.model_dump().items():
         setattr(class_, key, value)
     db.commit()
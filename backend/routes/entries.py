@@ -1,13 +1,19 @@
 """Routes for entries management."""
+from collections import defaultdict
 from datetime import date
-from typing import List, Optional
+from typing import Any, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import Entry
+from models import Entry, Pupil, Category
+from etag import check_not_modified, current_etag
+from pagination import paginate, MAX_PAGE_SIZE
+from services.importer import insert_returning_ids
+from services.search import search_entries
 
 router = APIRouter()
 
@@ -36,9 +42,61 @@ class EntryResponse(BaseModel):
         from_attributes = True
 
 
+class EntryBatchResult(BaseModel):
+    """Schema for the outcome of one item of a batch."""
+    index: int
+    status: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class EntryBatchResponse(BaseModel):
+    """Schema for batch creation response."""
+    created: int
+    failed: int
+    results: List[EntryBatchResult]
+
+
+class EntryChanges(BaseModel):
+    """Schema for a bulk entry update; only the given fields are changed."""
+    pupil_id: Optional[int] = None
+    category_id: Optional[int] = None
+    date: Optional[date] = None
+    text: Optional[str] = None
+    grade: Optional[str] = None
+    subject: Optional[str] = None
+
+
+class EntrySearchResult(EntryResponse):
+    """Schema for an entry found by full-text search."""
+    snippet: str
+    rank: float
+
+
+class EntryBulkResponse(BaseModel):
+    """Schema for bulk update and delete responses."""
+    matched: int
+    dry_run: bool
+
+
+MAX_BATCH_SIZE = 5000
+REQUIRED_FIELDS = ("pupil_id", "category_id", "date", "text")
+
+entry_list_adapter = TypeAdapter(List[EntryCreate])
+
+
+def check_references(db: Session, pupil_id: Optional[int], category_id: Optional[int]):
+    """Raise 404 if a given pupil or category does not exist."""
+    if pupil_id is not None and not db.get(Pupil, pupil_id):
+        raise HTTPException(status_code=404, detail="Pupil not found")
+    if category_id is not None and not db.get(Category, category_id):
+        raise HTTPException(status_code=404, detail="Category not found")
+
+
 @router.post("", response_model=EntryResponse, status_code=status.HTTP_201_CREATED)
 def create_entry(data: EntryCreate, db: Session = Depends(get_db)):
     """Create a new entry."""
+    check_references(db, data.pupil_id, data.category_id)
     entry = Entry(**data.model_dump())
     db.add(entry)
     db.commit()
@@ -46,24 +104,205 @@ def create_entry(data: EntryCreate, db: Session = Depends(get_db)):
     return entry
 
 
+def validate_batch(items: List[Any]) -> tuple:
+    """Validate batch items, returning {index: EntryCreate} and {index: error}.
+
+    The whole list is validated in one call. Its errors are located by
+    item index; only if there are any are the remaining items validated
+    once more to obtain their models.
+    """
+    try:
+        return dict(enumerate(entry_list_adapter.validate_python(items))), {}
+    except ValidationError as exc:
+        messages = defaultdict(list)
+        for err in exc.errors():
+            index, *loc = err["loc"]
+            messages[index].append(f"{'.'.join(str(part) for part in loc)}: {err['msg']}")
+    errors = {index: "; ".join(parts) for index, parts in messages.items()}
+    indexes = [index for index in range(len(items)) if index not in errors]
+    valid = entry_list_adapter.validate_python([items[index] for index in indexes])
+    return dict(zip(indexes, valid)), errors
+
+
+@router.post("/batch", response_model=EntryBatchResponse)
+def create_entries_batch(
+    response: Response,
+    items: List[Any] = Body(
+        ..., json_schema_extra={"items": {"$ref": "#/components/schemas/EntryCreate"}}
+    ),
+    db: Session = Depends(get_db)
+):
+    """Create many entries in one transaction.
+
+    Every item gets its own result: 201 with the new ID, 422 if it is
+    invalid or 404 if its pupil or category does not exist. Valid items are
+    created even if others fail; the response is 207 if any item failed.
+    """
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {MAX_BATCH_SIZE} entries per batch")
+    valid, errors = validate_batch(items)
+    results = {index: EntryBatchResult(index=index, status=422, error=error)
+               for index, error in errors.items()}
+
+    pupil_ids = {item.pupil_id for item in valid.values()}
+    category_ids = {item.category_id for item in valid.values()}
+    known_pupils = set(db.scalars(select(Pupil.id).where(Pupil.id.in_(pupil_ids))))
+    known_categories = set(db.scalars(
+        select(Category.id).where(Category.id.in_(category_ids))
+    ))
+    to_insert = []
+    for index, item in valid.items():
+        if item.pupil_id not in known_pupils:
+            results[index] = EntryBatchResult(index=index, status=404, error="Pupil not found")
+        elif item.category_id not in known_categories:
+            results[index] = EntryBatchResult(index=index, status=404,
+                                              error="Category not found")
+        else:
+            to_insert.append(index)
+
+    new_ids = insert_returning_ids(db, Entry, [valid[index].model_dump() for index in to_insert])
+    db.commit()
+    for index, new_id in zip(to_insert, new_ids):
+        results[index] = EntryBatchResult(index=index, status=201, id=new_id)
+
+    failed = len(items) - len(to_insert)
+    response.status_code = status.HTTP_207_MULTI_STATUS if failed else status.HTTP_201_CREATED
+    return EntryBatchResponse(created=len(to_insert), failed=failed,
+                              results=[results[index] for index in range(len(items))])
+
+
+def entry_filter(
+    ids: Optional[List[int]] = Query(None),
+    pupil_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    subject: Optional[str] = None
+) -> list:
+    """Turn bulk operation query parameters into WHERE conditions on entries."""
+    conditions = []
+    if ids is not None:
+        conditions.append(Entry.id.in_(ids))
+    if pupil_id is not None:
+        conditions.append(Entry.pupil_id == pupil_id)
+    if class_id is not None:
+        conditions.append(Entry.pupil_id.in_(select(Pupil.id).where(Pupil.class_id == class_id)))
+    if category_id is not None:
+        conditions.append(Entry.category_id == category_id)
+    if start_date is not None:
+        conditions.append(Entry.date >= start_date)
+    if end_date is not None:
+        conditions.append(Entry.date <= end_date)
+    if subject is not None:
+        conditions.append(Entry.subject == subject)
+    if not conditions:
+        raise HTTPException(status_code=400, detail="At least one filter is required")
+    return conditions
+
+
+def count_matching(db: Session, conditions: list) -> int:
+    """Count the entries matching bulk operation conditions."""
+    return db.scalar(select(func.count()).select_from(Entry).where(*conditions))
+
+
+@router.patch("", response_model=EntryBulkResponse)
+def update_entries(
+    changes: EntryChanges,
+    dry_run: bool = False,
+    conditions: list = Depends(entry_filter),
+    db: Session = Depends(get_db)
+):
+    """Change fields of every entry matching the filter with one UPDATE.
+
+    With dry_run the matching entries are only counted.
+    """
+    values = changes.model_dump(exclude_unset=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    if any(values.get(field, ...) is None for field in REQUIRED_FIELDS):
+        raise HTTPException(status_code=400, detail="Required fields cannot be null")
+    check_references(db, values.get("pupil_id"), values.get("category_id"))
+    if dry_run:
+        return EntryBulkResponse(matched=count_matching(db, conditions), dry_run=True)
+    result = db.execute(
+        update(Entry).where(*conditions).values(**values).execution_options(
+            synchronize_session=False
+        )
+    )
+    db.commit()
+    return EntryBulkResponse(matched=result.rowcount, dry_run=False)
+
+
+@router.delete("", response_model=EntryBulkResponse)
+def delete_entries(
+    dry_run: bool = False,
+    conditions: list = Depends(entry_filter),
+    db: Session = Depends(get_db)
+):
+    """Delete every entry matching the filter with one DELETE.
+
+    With dry_run the matching entries are only counted.
+    """
+    if dry_run:
+        return EntryBulkResponse(matched=count_matching(db, conditions), dry_run=True)
+    result = db.execute(
+        delete(Entry).where(*conditions).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return EntryBulkResponse(matched=result.rowcount, dry_run=False)
+
+
 @router.get("", response_model=List[EntryResponse])
 def get_entries(
+    request: Request,
+    response: Response,
     pupil_id: Optional[int] = None,
     category_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get all entries, optionally filtered by pupil or category."""
+    """Get entries, optionally filtered by pupil or category.
+
+    Pass limit and/or cursor to page through entries ordered by (date, id).
+    """
+    if pupil_id:
+        etag = current_etag(request, db, "pupil", pupil_id)
+    else:
+        etag = current_etag(request, db, "entries")
     query = db.query(Entry)
     if pupil_id:
         query = query.filter(Entry.pupil_id == pupil_id)
     if category_id:
         query = query.filter(Entry.category_id == category_id)
-    return query.all()
+    return paginate(query, [Entry.date, Entry.id], request, response, limit, cursor, etag)
+
+
+@router.get("/search", response_model=List[EntrySearchResult])
+def search(
+    q: str = Query(..., min_length=1),
+    pupil_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db)
+):
+    """Search entry text and subject, best matches first.
+
+    Every word is matched as a prefix, umlauts and ß may be written as
+    ae/oe/ue and ss. Matches are marked with ** in the snippet.
+    """
+    return search_entries(db, q, pupil_id, class_id, start_date, end_date, limit)
 
 
 @router.get("/{entry_id}", response_model=EntryResponse)
-def get_entry(entry_id: int, db: Session = Depends(get_db)):
+def get_entry(entry_id: int, request: Request, response: Response,
+              db: Session = Depends(get_db)):
     """Get an entry by ID."""
+    check_not_modified(request, response, db, "entries")
     entry = db.query(Entry).filter(Entry.id == entry_id).first()
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
@@ -76,6 +315,7 @@ def update_entry(entry_id: int, data: EntryCreate, db: Session = Depends(get_db)
     entry = db.query(Entry).filter(Entry.id == entry_id).first()
     if not entry:
         raise HTTPException(status_code=404, detail="Entry not found")
+    check_references(db, data.pupil_id, data.category_id)
     for key, value in data.model_dump().items():
         setattr(entry, key, value)
     db.commit()
@@ -1,21 +1,25 @@
 """Routes for data export and import."""
 import csv
-from datetime import date, datetime
+import json
+import zlib
+from datetime import date
 from io import StringIO
-from typing import List, Optional
+from typing import AsyncIterator, Iterator, List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import SchoolYear, Class, Pupil, Category, Entry
-
-
-def parse_date(date_str: str) -> date:
-    """Parse date string to date object."""
-    return datetime.strptime(date_str, "%Y-%m-%d").date()
+from services.importer import (
+    IMPORT_TABLES, IMPORTERS, BatchImporter, UnmappedReference, new_id_mapping
+)
+from services.reference_cache import invalidate_all as invalidate_reference_caches
 
 router = APIRouter()
 
@@ -31,12 +35,14 @@ class SchoolYearImport(BaseModel):
 
 class ClassImport(BaseModel):
     """Schema for class import."""
+    id: Optional[int] = None
     name: str
     school_year_id: int
 
 
 class PupilImport(BaseModel):
     """Schema for pupil import."""
+    id: Optional[int] = None
     first_name: str
     last_name: str
     class_id: int
@@ -44,6 +50,7 @@ class PupilImport(BaseModel):
 
 class CategoryImport(BaseModel):
     """Schema for category import."""
+    id: Optional[int] = None
     name_de: str
     name_en: str
     is_predefined: bool = False
@@ -51,6 +58,7 @@ class CategoryImport(BaseModel):
 
 class EntryImport(BaseModel):
     """Schema for entry import."""
+    id: Optional[int] = None
     pupil_id: int
     category_id: int
     date: str
@@ -68,18 +76,6 @@ class ImportData(BaseModel):
     entries: List[EntryImport] = []
 
 
-@router.get("/export/json")
-def export_json(db: Session = Depends(get_db)):
-    """Export all data as JSON."""
-    return {
-        "school_years": [serialize_school_year(sy) for sy in db.query(SchoolYear).all()],
-        "classes": [serialize_class(c) for c in db.query(Class).all()],
-        "pupils": [serialize_pupil(p) for p in db.query(Pupil).all()],
-        "categories": [serialize_category(c) for c in db.query(Category).all()],
-        "entries": [serialize_entry(e) for e in db.query(Entry).all()]
-    }
-
-
 def serialize_school_year(sy):
     """Serialize school year to dict."""
     return {"id": sy.id, "name": sy.name, "start_date": str(sy.start_date),
@@ -109,52 +105,233 @@ def serialize_entry(e):
             "date": str(e.date), "text": e.text, "grade": e.grade, "subject": e.subject}
 
 
-@router.get("/export/csv")
-def export_csv(db: Session = Depends(get_db)):
-    """Export all entries as CSV."""
+EXPORT_TABLES = [
+    ("school_years", "school_year", SchoolYear, serialize_school_year),
+    ("classes", "class", Class, serialize_class),
+    ("pupils", "pupil", Pupil, serialize_pupil),
+    ("categories", "category", Category, serialize_category),
+    ("entries", "entry", Entry, serialize_entry),
+]
+
+STREAM_BATCH_SIZE = 1000
+
+
+def iter_row_batches(db: Session, model):
+    """Yield lists of table rows, fetched STREAM_BATCH_SIZE at a time."""
+    stmt = select(model.__table__).order_by(model.id)
+    result = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+    yield from result.partitions()
+
+
+def stream_json_export(db: Session) -> Iterator[str]:
+    """Yield the full export as one JSON object, one row batch at a time."""
+    try:
+        yield "{"
+        for index, (key, _, model, serialize) in enumerate(EXPORT_TABLES):
+            yield ("," if index else "") + json.dumps(key) + ":["
+            separator = ""
+            for rows in iter_row_batches(db, model):
+                yield separator + ",".join(json.dumps(serialize(row)) for row in rows)
+                separator = ","
+            yield "]"
+        yield "}"
+    finally:
+        db.close()
+
+
+def stream_ndjson_export(db: Session) -> Iterator[str]:
+    """Yield one JSON record per line, tagged with its record type."""
+    try:
+        for _, record_type, model, serialize in EXPORT_TABLES:
+            for rows in iter_row_batches(db, model):
+                yield "".join(
+                    json.dumps({"type": record_type, **serialize(row)}) + "\n" for row in rows
+                )
+    finally:
+        db.close()
+
+
+@router.get("/export/json")
+def export_json(db: Session = Depends(get_db)):
+    """Export all data as JSON, streamed table by table."""
+    return StreamingResponse(stream_json_export(db), media_type="application/json")
+
+
+@router.get("/export/ndjson")
+def export_ndjson(db: Session = Depends(get_db)):
+    """Export all data as newline-delimited JSON records with a type field."""
+    headers = {"Content-Disposition": "attachment; filename=export.ndjson"}
+    return StreamingResponse(
+        stream_ndjson_export(db), media_type="application/x-ndjson", headers=headers
+    )
+
+
+CSV_HEADER = ["Pupil", "Category", "Date", "Text", "Grade", "Subject"]
+
+
+def build_csv_query(
+    lang: str,
+    school_year_id: Optional[int],
+    class_id: Optional[int],
+    start_date: Optional[date],
+    end_date: Optional[date]
+):
+    """Build the single joined query behind the CSV export."""
+    cat_name = Category.name_de if lang == "de" else Category.name_en
+    stmt = (
+        select(Pupil.first_name, Pupil.last_name, cat_name, Entry.date,
+               Entry.text, Entry.grade, Entry.subject)
+        .select_from(Entry)
+        .outerjoin(Pupil, Entry.pupil_id == Pupil.id)
+        .outerjoin(Category, Entry.category_id == Category.id)
+        .order_by(Entry.id)
+    )
+    if school_year_id:
+        stmt = stmt.join(Class, Pupil.class_id == Class.id)
+        stmt = stmt.where(Class.school_year_id == school_year_id)
+    if class_id:
+        stmt = stmt.where(Pupil.class_id == class_id)
+    if start_date:
+        stmt = stmt.where(Entry.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Entry.date <= end_date)
+    return stmt
+
+
+def stream_csv_export(db: Session, stmt) -> Iterator[str]:
+    """Yield CSV text for the query, one row batch at a time."""
     output = StringIO()
     writer = csv.writer(output)
-    writer.writerow(["Pupil", "Category", "Date", "Text", "Grade", "Subject"])
+    try:
+        writer.writerow(CSV_HEADER)
+        result = db.execute(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        for rows in result.partitions():
+            writer.writerows(
+                [f"{first} {last}" if first is not None else "N/A", cat or "N/A",
+                 entry_date, text, grade or "", subject or ""]
+                for first, last, cat, entry_date, text, grade, subject in rows
+            )
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+        yield output.getvalue()
+    finally:
+        db.close()
 
-    for entry in db.query(Entry).all():
-        pupil = entry.pupil
-        pupil_name = f"{pupil.first_name} {pupil.last_name}" if pupil else "N/A"
-        cat_name = entry.category.name_en if entry.category else "N/A"
-        writer.writerow([pupil_name, cat_name, entry.date, entry.text,
-                        entry.grade or "", entry.subject or ""])
 
-    output.seek(0)
+@router.get("/export/csv")
+def export_csv(
+    lang: str = Query("en", pattern="^(de|en)$"),
+    school_year_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Export entries as CSV, optionally filtered, with category names in lang."""
+    stmt = build_csv_query(lang, school_year_id, class_id, start_date, end_date)
     headers = {"Content-Disposition": "attachment; filename=export.csv"}
-    return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers=headers)
+    return StreamingResponse(stream_csv_export(db, stmt), media_type="text/csv", headers=headers)
 
 
 @router.post("/import/json")
 def import_json(data: ImportData, db: Session = Depends(get_db)):
-    """Import data from JSON."""
-    id_mapping = {"school_years": {}, "classes": {}, "pupils": {}, "categories": {}}
-    counts = {"school_years": 0, "classes": 0, "pupils": 0, "categories": 0, "entries": 0}
-
-    # Import school years
-    for sy in data.school_years:
-        old_id = sy.id
-        new_sy = SchoolYear(
-            name=sy.name,
-            start_date=parse_date(sy.start_date),
-            end_date=parse_date(sy.end_date),
-            is_active=sy.is_active
-        )
-        db.add(new_sy)
-        db.flush()
-        if old_id:
-            id_mapping["school_years"][old_id] = new_sy.id
-        counts["school_years"] += 1
-
-    # Import classes with mapped school year IDs
-    for c in data.classes:
-        sy_id = id_mapping["school_years"].get(c.school_year_id, c.school_year_id)
-        new_class = Class(name=c.name, school_year_id=sy_id)
-        db.add(new_class)
-        counts["classes"] += 1
-
-    db.commit()
+    """Import data from JSON in one transaction, remapping all IDs."""
+    id_mapping = new_id_mapping()
+    counts = {}
+    try:
+        for table in IMPORT_TABLES:
+            counts[table] = IMPORTERS[table](db, getattr(data, table), id_mapping)
+        db.commit()
+        invalidate_reference_caches()
+    except UnmappedReference as exc:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(exc))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Import references unknown records")
+    except ValueError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Invalid date in import data")
     return {"message": "Import successful", "imported": counts}
+
+
+NDJSON_RECORD_TYPES = {
+    "school_year": ("school_years", SchoolYearImport),
+    "class": ("classes", ClassImport),
+    "pupil": ("pupils", PupilImport),
+    "category": ("categories", CategoryImport),
+    "entry": ("entries", EntryImport),
+}
+
+
+async def iter_body_lines(request: Request) -> AsyncIterator[List[bytes]]:
+    """Yield the complete lines of each received body chunk, gunzipping on the fly if needed."""
+    gzipped = request.headers.get("content-encoding", "").lower() == "gzip"
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS) if gzipped else None
+    pending = b""
+    async for chunk in request.stream():
+        pending += decompressor.decompress(chunk) if decompressor else chunk
+        *lines, pending = pending.split(b"\n")
+        if lines:
+            yield lines
+    if decompressor:
+        pending += decompressor.flush()
+    yield pending.split(b"\n")
+
+
+def parse_ndjson_record(line: bytes, line_number: int) -> tuple:
+    """Validate one NDJSON line and return its table and import schema object."""
+    try:
+        record = json.loads(line)
+        table, schema = NDJSON_RECORD_TYPES[record.pop("type")]
+        return table, schema.model_validate(record)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail=f"Invalid record on line {line_number}")
+
+
+def import_lines(importer: BatchImporter, lines: List[bytes], line_number: int) -> int:
+    """Validate and queue NDJSON lines, writing full batches; return the last line number."""
+    for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        table, item = parse_ndjson_record(line, line_number)
+        if importer.needs_flush(table):
+            importer.flush()
+        importer.add(table, item)
+    return line_number
+
+
+@router.post("/import/ndjson")
+async def import_ndjson(request: Request, db: Session = Depends(get_db)):
+    """Import a streamed, optionally gzip-compressed NDJSON export in batches.
+
+    Only reading the body happens on the event loop; the lines of each
+    received chunk are validated and written in the threadpool.
+    """
+    importer = BatchImporter(db)
+    line_number = 0
+    try:
+        async for lines in iter_body_lines(request):
+            line_number = await run_in_threadpool(import_lines, importer, lines, line_number)
+        await run_in_threadpool(importer.flush)
+        await run_in_threadpool(db.commit)
+        invalidate_reference_caches()
+    except UnmappedReference as exc:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=400, detail=str(exc))
+    except IntegrityError:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=400, detail="Import references unknown records")
+    except ValueError:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=400, detail="Invalid date in import data")
+    except zlib.error:
+        await run_in_threadpool(db.rollback)
+        raise HTTPException(status_code=400, detail="Invalid gzip request body")
+    except HTTPException:
+        await run_in_threadpool(db.rollback)
+        raise
+    return {"message": "Import successful", "imported": importer.counts,
+            "batches": importer.batches}
@@ -1,12 +1,15 @@
 """Routes for pupils management."""
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from database import get_db
-from models import Pupil
+from models import Class, Pupil
+from etag import check_not_modified, current_etag
+from pagination import paginate, MAX_PAGE_SIZE
+from services.search import search_pupils
 
 router = APIRouter()
 
@@ -29,9 +32,16 @@ class PupilResponse(BaseModel):
         from_attributes = True
 
 
+def check_class(db: Session, class_id: int):
+    """Raise 404 if the pupil's class does not exist."""
+    if not db.get(Class, class_id):
+        raise HTTPException(status_code=404, detail="Class not found")
+
+
 @router.post("", response_model=PupilResponse, status_code=status.HTTP_201_CREATED)
 def create_pupil(data: PupilCreate, db: Session = Depends(get_db)):
     """Create a new pupil."""
+    check_class(db, data.class_id)
     pupil = Pupil(**data.model_dump())
     db.add(pupil)
     db.commit()
@@ -40,17 +50,39 @@ def create_pupil(data: PupilCreate, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=List[PupilResponse])
-def get_pupils(class_id: Optional[int] = None, db: Session = Depends(get_db)):
-    """Get all pupils, optionally filtered by class."""
+def get_pupils(
+    request: Request,
+    response: Response,
+    class_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get pupils, optionally filtered by class and paged by id."""
+    etag = current_etag(request, db, "pupils")
     query = db.query(Pupil)
     if class_id:
         query = query.filter(Pupil.class_id == class_id)
-    return query.all()
+    return paginate(query, [Pupil.id], request, response, limit, cursor, etag)
+
+
+@router.get("/search", response_model=List[PupilResponse])
+def search(
+    q: str = Query(..., min_length=1),
+    school_year_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Find pupils by name for typeahead, tolerating typos and umlaut spellings."""
+    return search_pupils(db, q, school_year_id, class_id, limit)
 
 
 @router.get("/{pupil_id}", response_model=PupilResponse)
-def get_pupil(pupil_id: int, db: Session = Depends(get_db)):
+def get_pupil(pupil_id: int, request: Request, response: Response,
+              db: Session = Depends(get_db)):
     """Get a pupil by ID."""
+    check_not_modified(request, response, db, "pupils")
     pupil = db.query(Pupil).filter(Pupil.id == pupil_id).first()
     if not pupil:
         raise HTTPException(status_code=404, detail="Pupil not found")
@@ -63,6 +95,7 @@ def update_pupil(pupil_id: int, data: PupilCreate, db: Session = Depends(get_db)
     pupil = db.query(Pupil).filter(Pupil.id == pupil_id).first()
     if not pupil:
         raise HTTPException(status_code=404, detail="Pupil not found")
+    check_class(db, data.class_id)
     for key, value in data.model_dump().items():
         setattr(pupil, key, value)
     db.commit()
@@ -1,17 +1,24 @@
 """Routes for generating pupil reports."""
-from datetime import date
-from typing import Optional, Dict, Any, List
+import os
+from contextlib import contextmanager
+from urllib.parse import quote
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List, Literal, BinaryIO, Iterator
 from collections import defaultdict
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session, sessionmaker
 
 from database import get_db
-from models import Pupil, Entry
-from services.pdf_generator import generate_pdf_report
-from services.word_generator import generate_word_report
+from models import Pupil, Entry, Class, Category, DataVersion, ReportJob
+from services.rendering import (
+    render, render_to_file, start_stream, stream_reports_zip,
+    RenderQueueFull, RenderTimeout, FILE_RENDERERS
+)
+from services import jobs, report_cache
 
 router = APIRouter()
 
@@ -34,30 +41,100 @@ class ReportResponse(BaseModel):
     entries_by_category: Dict[str, List[EntryData]]
 
 
-def build_report_data(pupil: Pupil, entries: list, start: date, end: date) -> dict:
-    """Build report data dictionary from pupil and entries."""
+def group_by_category(rows) -> dict:
+    """Group (category name, date, text, grade, subject) rows by category."""
     entries_by_cat = defaultdict(list)
-    for entry in entries:
-        cat_name = entry.category.name_en
+    for cat_name, entry_date, text, grade, subject in rows:
         entries_by_cat[cat_name].append({
-            "date": str(entry.date),
-            "text": entry.text,
-            "grade": entry.grade,
-            "subject": entry.subject
+            "date": str(entry_date),
+            "text": text,
+            "grade": grade,
+            "subject": subject
         })
+    return dict(entries_by_cat)
+
+
+def make_report_data(pupil: Pupil, class_name: str, entries_by_category: dict,
+                     start: date, end: date) -> dict:
+    """Assemble the report data dictionary for one pupil."""
     return {
         "pupil_id": pupil.id,
         "pupil_name": f"{pupil.first_name} {pupil.last_name}",
-        "class_name": pupil.class_.name if pupil.class_ else "N/A",
+        "class_name": class_name,
         "start_date": str(start),
         "end_date": str(end),
-        "entries_by_category": dict(entries_by_cat)
+        "entries_by_category": entries_by_category
     }
 
 
+class ReportJobCreate(BaseModel):
+    """Schema for requesting a background report job."""
+    format: Literal["pdf", "docx"]
+    pupil_id: Optional[int] = None
+    class_id: Optional[int] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class ReportJobResponse(BaseModel):
+    """Schema for report job status."""
+    id: str
+    format: str
+    pupil_id: Optional[int]
+    class_id: Optional[int]
+    status: str
+    progress: int
+    total: int
+    error: Optional[str]
+    created_at: datetime
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+def pupil_report_query(pupil_id: int, start: date, end: date):
+    """Select a pupil, their class and dated entries with category names.
+
+    Rows come back sorted by category and date, one per entry, or a single
+    row with empty entry columns if the pupil has no entries in range.
+    """
+    return (
+        select(Pupil.id, Pupil.first_name, Pupil.last_name,
+               Class.name.label("class_name"), Entry.id.label("entry_id"),
+               Category.name_en, Entry.date, Entry.text, Entry.grade, Entry.subject)
+        .select_from(Pupil)
+        .outerjoin(Class, Pupil.class_id == Class.id)
+        .outerjoin(Entry, (Entry.pupil_id == Pupil.id)
+                   & (Entry.date >= start) & (Entry.date <= end))
+        .outerjoin(Category, Entry.category_id == Category.id)
+        .where(Pupil.id == pupil_id)
+        .order_by(Category.name_en, Entry.date, Entry.id)
+    )
+
+
+def build_report_data(rows: list, start: date, end: date) -> dict:
+    """Build report data dictionary from pupil_report_query rows."""
+    pupil = rows[0]
+    entry_rows = (
+        (row.name_en, row.date, row.text, row.grade, row.subject)
+        for row in rows if row.entry_id is not None
+    )
+    return make_report_data(pupil, pupil.class_name or "N/A",
+                            group_by_category(entry_rows), start, end)
+
+
 DEFAULT_START_DATE = date(2000, 1, 1)
 DEFAULT_END_DATE = date(2100, 12, 31)
 
+# Reports with at least this many entries are rendered straight to disk.
+LONG_REPORT_ENTRIES = int(os.environ.get("PUPIL_TRACKER_LONG_REPORT_ENTRIES", "500"))
+
+REPORT_MEDIA_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+}
+
 
 def get_pupil_or_404(db: Session, pupil_id: int) -> Pupil:
     """Get pupil by ID or raise 404."""
@@ -73,17 +150,13 @@ def get_pupil_report_data(
     start_date: Optional[date],
     end_date: Optional[date]
 ) -> tuple:
-    """Get pupil, entries, and build report data."""
-    pupil = get_pupil_or_404(db, pupil_id)
+    """Get pupil and report data with a single query, or raise 404."""
     start = start_date or DEFAULT_START_DATE
     end = end_date or DEFAULT_END_DATE
-    entries = db.query(Entry).filter(
-        Entry.pupil_id == pupil_id,
-        Entry.date >= start,
-        Entry.date <= end
-    ).all()
-    report_data = build_report_data(pupil, entries, start, end)
-    return pupil, report_data
+    rows = db.execute(pupil_report_query(pupil_id, start, end)).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="Pupil not found")
+    return rows[0], build_report_data(rows, start, end)
 
 
 @router.get("/pupil/{pupil_id}", response_model=ReportResponse)
@@ -98,6 +171,102 @@ def get_pupil_report(
     return report_data
 
 
+def get_versions(db: Session, scopes: list) -> tuple:
+    """Return the data version of every (scope, key) pair, 0 if never bumped."""
+    rows = db.query(DataVersion).filter(
+        tuple_(DataVersion.scope, DataVersion.key).in_(scopes)
+    ).all()
+    versions = {(row.scope, row.key): row.version for row in rows}
+    return tuple(versions.get(scope, 0) for scope in scopes)
+
+
+def get_report_version(db: Session, pupil: Pupil) -> tuple:
+    """Return the data versions a pupil's report depends on."""
+    return get_versions(db, [("pupil", pupil.id), ("class", pupil.class_id or 0),
+                             ("categories", 0)])
+
+
+def count_entries(report_data: dict) -> int:
+    """Return the number of entries in a report."""
+    return sum(len(entries) for entries in report_data["entries_by_category"].values())
+
+
+@contextmanager
+def render_errors_as_http():
+    """Map a full render queue to 503 and a render timeout to 504."""
+    try:
+        yield
+    except RenderQueueFull:
+        raise HTTPException(status_code=503, detail="Report renderer is busy",
+                            headers={"Retry-After": "5"})
+    except RenderTimeout:
+        raise HTTPException(status_code=504, detail="Report rendering timed out")
+
+
+def render_for_request(fmt: str, report_data: dict, path: Optional[str] = None):
+    """Render a report in the process pool, mapping overload to HTTP errors.
+
+    Returns the bytes, or writes them to path if one is given.
+    """
+    with render_errors_as_http():
+        if path is not None:
+            return render_to_file(fmt, report_data, path)
+        return render(fmt, report_data)
+
+
+def iter_file(handle: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Read an open file in chunks and close it at the end."""
+    with handle:
+        while chunk := handle.read(chunk_size):
+            yield chunk
+
+
+def content_disposition(filename: str) -> str:
+    """Return an attachment Content-Disposition, RFC 5987-encoding unsafe names."""
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quoted}"
+
+
+def cached_file_response(handle: BinaryIO, media_type: str, filename: str) -> StreamingResponse:
+    """Send an open cached report as a download.
+
+    Serving the open file rather than its path keeps a report readable
+    when the cache evicts it while the response is being sent.
+    """
+    headers = {"Content-Disposition": content_disposition(filename),
+               "Content-Length": str(os.fstat(handle.fileno()).st_size)}
+    return StreamingResponse(iter_file(handle), media_type=media_type, headers=headers)
+
+
+def cached_report_response(
+    db: Session,
+    pupil_id: int,
+    fmt: str,
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> StreamingResponse:
+    """Serve a rendered pupil report from the cache, rendering it on a miss."""
+    pupil = get_pupil_or_404(db, pupil_id)
+    start = start_date or DEFAULT_START_DATE
+    end = end_date or DEFAULT_END_DATE
+    key = report_cache.cache_key(pupil_id, start, end, fmt, *get_report_version(db, pupil))
+    handle = report_cache.open_cached(key, fmt)
+    if handle is None:
+        _, report_data = get_pupil_report_data(db, pupil_id, start, end)
+        if fmt in FILE_RENDERERS and count_entries(report_data) >= LONG_REPORT_ENTRIES:
+            handle = report_cache.store_and_open(
+                key, fmt, lambda tmp_path: render_for_request(fmt, report_data, tmp_path)
+            )
+        else:
+            handle = report_cache.store_and_open(
+                key, fmt, report_cache.bytes_writer(render_for_request(fmt, report_data))
+            )
+    filename = f"report_{pupil.last_name}_{pupil.first_name}.{fmt}"
+    return cached_file_response(handle, REPORT_MEDIA_TYPES[fmt], filename)
+
+
 @router.get("/pupil/{pupil_id}/pdf")
 def download_pdf_report(
     pupil_id: int,
@@ -106,11 +275,7 @@ def download_pdf_report(
     db: Session = Depends(get_db)
 ):
     """Download PDF report for a pupil."""
-    pupil, report_data = get_pupil_report_data(db, pupil_id, start_date, end_date)
-    pdf_buffer = generate_pdf_report(report_data)
-    filename = f"report_{pupil.last_name}_{pupil.first_name}.pdf"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(pdf_buffer, media_type="application/pdf", headers=headers)
+    return cached_report_response(db, pupil_id, "pdf", start_date, end_date)
 
 
 @router.get("/pupil/{pupil_id}/docx")
@@ -121,9 +286,184 @@ def download_word_report(
     db: Session = Depends(get_db)
 ):
     """Download Word document report for a pupil."""
-    pupil, report_data = get_pupil_report_data(db, pupil_id, start_date, end_date)
-    docx_buffer = generate_word_report(report_data)
-    filename = f"report_{pupil.last_name}_{pupil.first_name}.docx"
-    media = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    headers = {"Content-Disposition": f"attachment; filename={filename}"}
-    return StreamingResponse(docx_buffer, media_type=media, headers=headers)
+    return cached_report_response(db, pupil_id, "docx", start_date, end_date)
+
+
+def get_class_or_404(db: Session, class_id: int) -> Class:
+    """Get class by ID or raise 404."""
+    class_ = db.query(Class).filter(Class.id == class_id).first()
+    if not class_:
+        raise HTTPException(status_code=404, detail="Class not found")
+    return class_
+
+
+def get_class_report_data(
+    db: Session,
+    class_id: int,
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> tuple:
+    """Get a class and report data for each of its pupils.
+
+    The entries of all pupils are loaded with a single joined query.
+    """
+    class_ = get_class_or_404(db, class_id)
+    start = start_date or DEFAULT_START_DATE
+    end = end_date or DEFAULT_END_DATE
+    pupils = db.query(Pupil).filter(Pupil.class_id == class_id).order_by(
+        Pupil.last_name, Pupil.first_name, Pupil.id
+    ).all()
+    rows = db.execute(
+        select(Entry.pupil_id, Category.name_en, Entry.date,
+               Entry.text, Entry.grade, Entry.subject)
+        .join(Category, Entry.category_id == Category.id)
+        .join(Pupil, Entry.pupil_id == Pupil.id)
+        .where(Pupil.class_id == class_id, Entry.date >= start, Entry.date <= end)
+        .order_by(Entry.pupil_id, Category.name_en, Entry.date, Entry.id)
+    )
+    rows_by_pupil = defaultdict(list)
+    for pupil_id, *row in rows:
+        rows_by_pupil[pupil_id].append(row)
+    reports = [
+        (pupil, make_report_data(pupil, class_.name, group_by_category(rows_by_pupil[pupil.id]),
+                                 start, end))
+        for pupil in pupils
+    ]
+    return class_, reports
+
+
+def get_class_report_version(db: Session, class_: Class) -> tuple:
+    """Return the pupils of a class and the data versions its merged report depends on."""
+    pupil_ids = [pupil_id for (pupil_id,) in db.query(Pupil.id).filter(
+        Pupil.class_id == class_.id
+    ).order_by(Pupil.id)]
+    scopes = [("class", class_.id), ("categories", 0)]
+    scopes += [("pupil", pupil_id) for pupil_id in pupil_ids]
+    return tuple(pupil_ids) + get_versions(db, scopes)
+
+
+def class_report_files(reports: list, fmt: str) -> list:
+    """Return (filename, report data) pairs for a class archive."""
+    return [
+        (f"report_{pupil.last_name}_{pupil.first_name}_{pupil.id}.{fmt}", report_data)
+        for pupil, report_data in reports
+    ]
+
+
+def download_class_reports(db: Session, class_id: int, fmt: str,
+                           start_date: Optional[date], end_date: Optional[date]):
+    """Stream a ZIP with one rendered report per pupil of a class.
+
+    The first report is rendered before the response starts, so a busy
+    renderer is answered with 503 rather than a truncated archive.
+    """
+    class_, reports = get_class_report_data(db, class_id, start_date, end_date)
+    files = class_report_files(reports, fmt)
+    filename = f"reports_{class_.name}_{fmt}.zip"
+    headers = {"Content-Disposition": content_disposition(filename)}
+    with render_errors_as_http():
+        chunks = start_stream(stream_reports_zip(fmt, files))
+    return StreamingResponse(chunks,
+                             media_type="application/zip", headers=headers)
+
+
+@router.get("/class/{class_id}/merged.pdf")
+def download_merged_class_report(
+    class_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Download one PDF with a table of contents and a section per pupil of a class."""
+    class_ = get_class_or_404(db, class_id)
+    start = start_date or DEFAULT_START_DATE
+    end = end_date or DEFAULT_END_DATE
+    key = report_cache.cache_key("class", class_id, start, end,
+                                 *get_class_report_version(db, class_))
+    handle = report_cache.open_cached(key, "pdf")
+    if handle is None:
+        _, reports = get_class_report_data(db, class_id, start, end)
+        class_data = {
+            "class_name": class_.name,
+            "start_date": str(start),
+            "end_date": str(end),
+            "reports": [report_data for _, report_data in reports],
+        }
+        handle = report_cache.store_and_open(
+            key, "pdf", lambda tmp_path: render_for_request("class_pdf", class_data, tmp_path)
+        )
+    return cached_file_response(handle, REPORT_MEDIA_TYPES["pdf"],
+                                f"reports_{class_.name}.pdf")
+
+
+@router.get("/class/{class_id}/pdf")
+def download_class_pdf_reports(
+    class_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Download a ZIP of PDF reports for every pupil in a class."""
+    return download_class_reports(db, class_id, "pdf", start_date, end_date)
+
+
+@router.get("/class/{class_id}/docx")
+def download_class_word_reports(
+    class_id: int,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    """Download a ZIP of Word reports for every pupil in a class."""
+    return download_class_reports(db, class_id, "docx", start_date, end_date)
+
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_report_job(data: ReportJobCreate, db: Session = Depends(get_db)):
+    """Queue a pupil report or a class report archive for background rendering."""
+    if (data.pupil_id is None) == (data.class_id is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of pupil_id or class_id")
+    if data.pupil_id is not None:
+        pupil, report_data = get_pupil_report_data(
+            db, data.pupil_id, data.start_date, data.end_date
+        )
+        filename = f"report_{pupil.last_name}_{pupil.first_name}.{data.format}"
+        files, archive = [(filename, report_data)], False
+    else:
+        class_, reports = get_class_report_data(
+            db, data.class_id, data.start_date, data.end_date
+        )
+        filename = f"reports_{class_.name}_{data.format}.zip"
+        files, archive = class_report_files(reports, data.format), True
+
+    jobs.cleanup_expired_jobs(db)
+    job = jobs.create_job(db, data.format, filename, total=len(files),
+                          **data.model_dump(exclude={"format"}))
+    jobs.submit_job(sessionmaker(bind=db.get_bind()), job, files, archive)
+    return job
+
+
+def get_job_or_404(db: Session, job_id: str) -> ReportJob:
+    """Get report job by ID or raise 404."""
+    job = db.query(ReportJob).filter(ReportJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+def get_report_job(job_id: str, db: Session = Depends(get_db)):
+    """Get the status and progress of a report job."""
+    return get_job_or_404(db, job_id)
+
+
+@router.get("/jobs/{job_id}/result")
+def download_report_job_result(job_id: str, db: Session = Depends(get_db)):
+    """Download the rendered file of a finished report job."""
+    job = get_job_or_404(db, job_id)
+    if job.status != jobs.DONE:
+        raise HTTPException(status_code=409, detail=f"Report job is {job.status}")
+    if not job.result_path or not os.path.exists(job.result_path):
+        raise HTTPException(status_code=404, detail="Report job result has expired")
+    media = "application/zip" if job.class_id is not None else REPORT_MEDIA_TYPES[job.format]
+    return FileResponse(job.result_path, media_type=media, filename=job.filename)
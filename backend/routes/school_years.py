@@ -2,12 +2,15 @@
 from datetime import date
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
 from database import get_db
 from models import SchoolYear
+from etag import check_not_modified, current_etag, respond_not_modified
+from pagination import paginate, MAX_PAGE_SIZE
+from services.reference_cache import school_year_cache
 
 router = APIRouter()
 
@@ -38,29 +41,51 @@ def create_school_year(data: SchoolYearCreate, db: Session = Depends(get_db)):
     school_year = SchoolYear(**data.model_dump())
     db.add(school_year)
     db.commit()
+    school_year_cache.invalidate()
     db.refresh(school_year)
     return school_year
 
 
 @router.get("", response_model=List[SchoolYearResponse])
-def get_school_years(db: Session = Depends(get_db)):
-    """Get all school years."""
-    return db.query(SchoolYear).all()
+def get_school_years(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get school years, paged by id.
+
+    Unpaged requests are served from the in-process school year cache.
+    """
+    snapshot = school_year_cache.snapshot(db)
+    etag = current_etag(request, db, "school_years", version=snapshot.version)
+    if limit is None and cursor is None:
+        respond_not_modified(request, response, etag)
+        return snapshot.rows
+    query = db.query(SchoolYear)
+    return paginate(query, [SchoolYear.id], request, response, limit, cursor, etag)
 
 
 @router.get("/active", response_model=SchoolYearResponse)
-def get_active_school_year(db: Session = Depends(get_db)):
+def get_active_school_year(request: Request, response: Response,
+                           db: Session = Depends(get_db)):
     """Get the active school year."""
-    school_year = db.query(SchoolYear).filter(SchoolYear.is_active == True).first()
+    snapshot = school_year_cache.snapshot(db)
+    check_not_modified(request, response, db, "school_years", version=snapshot.version)
+    school_year = next((row for row in snapshot.rows if row.is_active), None)
     if not school_year:
         raise HTTPException(status_code=404, detail="No active school year")
     return school_year
 
 
 @router.get("/{year_id}", response_model=SchoolYearResponse)
-def get_school_year(year_id: int, db: Session = Depends(get_db)):
+def get_school_year(year_id: int, request: Request, response: Response,
+                    db: Session = Depends(get_db)):
     """Get a school year by ID."""
-    school_year = db.query(SchoolYear).filter(SchoolYear.id == year_id).first()
+    snapshot = school_year_cache.snapshot(db)
+    check_not_modified(request, response, db, "school_years", version=snapshot.version)
+    school_year = snapshot.by_id.get(year_id)
     if not school_year:
         raise HTTPException(status_code=404, detail="School year not found")
     return school_year
@@ -75,6 +100,7 @@ def update_school_year(year_id: int, data: SchoolYearCreate, db: Session = Depen
     for key, value in data.model_dump().items():
         setattr(school_year, key, value)
     db.commit()
+    school_year_cache.invalidate()
     db.refresh(school_year)
     return school_year
 
@@ -87,4 +113,5 @@ def delete_school_year(year_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="School year not found")
     db.delete(school_year)
     db.commit()
+    school_year_cache.invalidate()
     return None
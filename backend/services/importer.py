@@ -0,0 +1,167 @@
+"""Bulk import service for exported pupil tracker data."""
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models import SchoolYear, Class, Pupil, Category, Entry
+
+logger = logging.getLogger(__name__)
+
+IMPORT_TABLES = ["school_years", "classes", "pupils", "categories", "entries"]
+IMPORT_BATCH_SIZE = 5000
+
+
+def parse_date(date_str: str) -> date:
+    """Parse a YYYY-MM-DD date string to a date object."""
+    return date.fromisoformat(date_str)
+
+
+def new_id_mapping() -> Dict[str, Dict[int, int]]:
+    """Return an empty old-ID to new-ID mapping for every referenced table."""
+    return {table: {} for table in IMPORT_TABLES if table != "entries"}
+
+
+class UnmappedReference(Exception):
+    """Raised when an imported record references an ID the import did not define."""
+
+
+def describe(table: str, item) -> str:
+    """Name an imported record for error messages."""
+    return f"{table} record {item.id}" if item.id is not None else f"{table} record"
+
+
+def remap(id_mapping: dict, table: str, old_id: int, record: str) -> int:
+    """Translate an exported ID, rejecting IDs that were not imported before."""
+    try:
+        return id_mapping[table][old_id]
+    except KeyError:
+        raise UnmappedReference(
+            f"{record} references unknown {table} id {old_id}"
+        ) from None
+
+
+def insert_returning_ids(db: Session, model, rows: List[dict]) -> List[int]:
+    """Insert rows in one executemany and return the new IDs in row order."""
+    if not rows:
+        return []
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+    return list(db.execute(stmt, rows).scalars())
+
+
+def record_ids(mapping: Dict[int, int], items: list, new_ids: List[int]):
+    """Remember the new ID of every item that carried an exported ID."""
+    for item, new_id in zip(items, new_ids):
+        if item.id is not None:
+            mapping[item.id] = new_id
+
+
+def import_school_years(db: Session, items: list, id_mapping: dict) -> int:
+    """Bulk insert school years."""
+    rows = [{"name": sy.name, "start_date": parse_date(sy.start_date),
+             "end_date": parse_date(sy.end_date), "is_active": sy.is_active}
+            for sy in items]
+    record_ids(id_mapping["school_years"], items, insert_returning_ids(db, SchoolYear, rows))
+    return len(rows)
+
+
+def import_classes(db: Session, items: list, id_mapping: dict) -> int:
+    """Bulk insert classes with remapped school year IDs."""
+    rows = [{"name": c.name,
+             "school_year_id": remap(id_mapping, "school_years", c.school_year_id,
+                                     describe("classes", c))}
+            for c in items]
+    record_ids(id_mapping["classes"], items, insert_returning_ids(db, Class, rows))
+    return len(rows)
+
+
+def import_pupils(db: Session, items: list, id_mapping: dict) -> int:
+    """Bulk insert pupils with remapped class IDs."""
+    rows = [{"first_name": p.first_name, "last_name": p.last_name,
+             "class_id": remap(id_mapping, "classes", p.class_id, describe("pupils", p))}
+            for p in items]
+    record_ids(id_mapping["pupils"], items, insert_returning_ids(db, Pupil, rows))
+    return len(rows)
+
+
+def import_categories(db: Session, items: list, id_mapping: dict) -> int:
+    """Bulk insert categories, reusing matching predefined ones."""
+    predefined = {
+        (row.name_de, row.name_en): row.id
+        for row in db.execute(
+            select(Category.id, Category.name_de, Category.name_en)
+            .where(Category.is_predefined == True)
+        )
+    }
+    new_items = []
+    for c in items:
+        existing_id = predefined.get((c.name_de, c.name_en)) if c.is_predefined else None
+        if existing_id is None:
+            new_items.append(c)
+        elif c.id is not None:
+            id_mapping["categories"][c.id] = existing_id
+    rows = [{"name_de": c.name_de, "name_en": c.name_en, "is_predefined": c.is_predefined}
+            for c in new_items]
+    record_ids(id_mapping["categories"], new_items, insert_returning_ids(db, Category, rows))
+    return len(rows)
+
+
+def import_entries(db: Session, items: list, id_mapping: dict) -> int:
+    """Bulk insert entries with remapped pupil and category IDs."""
+    rows = [{"pupil_id": remap(id_mapping, "pupils", e.pupil_id, describe("entries", e)),
+             "category_id": remap(id_mapping, "categories", e.category_id,
+                                  describe("entries", e)),
+             "date": parse_date(e.date), "text": e.text,
+             "grade": e.grade, "subject": e.subject}
+            for e in items]
+    if rows:
+        db.execute(insert(Entry), rows)
+    return len(rows)
+
+
+IMPORTERS = {
+    "school_years": import_school_years,
+    "classes": import_classes,
+    "pupils": import_pupils,
+    "categories": import_categories,
+    "entries": import_entries,
+}
+
+
+class BatchImporter:
+    """Insert a stream of records in fixed-size batches, keeping ID mappings.
+
+    Records are batched per table in arrival order, so referenced records
+    must appear before the records that reference them, as in an export.
+    """
+
+    def __init__(self, db: Session, batch_size: Optional[int] = None):
+        self.db = db
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+        self.id_mapping = new_id_mapping()
+        self.counts = {table: 0 for table in IMPORT_TABLES}
+        self.batches = 0
+        self.table = None
+        self.pending = []
+
+    def needs_flush(self, table: str) -> bool:
+        """Return True if the pending batch must be written before adding to table."""
+        return bool(self.pending) and (
+            table != self.table or len(self.pending) >= self.batch_size
+        )
+
+    def add(self, table: str, item):
+        """Queue a validated record for the given table."""
+        self.table = table
+        self.pending.append(item)
+
+    def flush(self):
+        """Write the pending batch."""
+        if not self.pending:
+            return
+        self.counts[self.table] += IMPORTERS[self.table](self.db, self.pending, self.id_mapping)
+        self.pending = []
+        self.batches += 1
+        logger.info("Import batch %d written, totals so far: %s", self.batches, self.counts)
@@ -0,0 +1,168 @@
+"""Background report jobs rendered by a bounded worker pool."""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from models import ReportJob
+from services.rendering import render, stream_reports_zip
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("PUPIL_TRACKER_JOB_WORKERS", "2"))
+JOB_RESULT_DIR = os.environ.get("PUPIL_TRACKER_JOB_DIR", "./report_jobs")
+JOB_RESULT_TTL = timedelta(
+    seconds=int(os.environ.get("PUPIL_TRACKER_JOB_TTL_SECONDS", str(24 * 60 * 60)))
+)
+
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("PUPIL_TRACKER_JOB_HEARTBEAT_SECONDS", "15"))
+# Jobs whose owner has not confirmed them for this long are treated as orphaned.
+JOB_HEARTBEAT_TIMEOUT = timedelta(seconds=3 * JOB_HEARTBEAT_INTERVAL)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Identifies this process as the owner of the jobs it runs.
+JOB_OWNER = uuid.uuid4().hex
+
+_executor = None
+_heartbeat_stop = None
+
+
+def get_job_executor() -> ThreadPoolExecutor:
+    """Return the shared job executor, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="report-job")
+    return _executor
+
+
+def shutdown_job_executor():
+    """Stop accepting jobs and wait for running ones to finish."""
+    global _executor, _heartbeat_stop
+    if _heartbeat_stop is not None:
+        _heartbeat_stop.set()
+        _heartbeat_stop = None
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def update_job(session_factory: Callable[[], Session], job_id: str, **values):
+    """Set columns of a job row in a short transaction of its own."""
+    db = session_factory()
+    try:
+        db.query(ReportJob).filter(ReportJob.id == job_id).update(
+            {"heartbeat_at": datetime.utcnow(), **values}
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def create_job(db: Session, fmt: str, filename: str, total: int, **values) -> ReportJob:
+    """Insert a queued job row."""
+    job = ReportJob(id=uuid.uuid4().hex, format=fmt, filename=filename,
+                    total=total, status=QUEUED, owner=JOB_OWNER,
+                    heartbeat_at=datetime.utcnow(), **values)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def run_job(session_factory: Callable[[], Session], job_id: str, fmt: str,
+            files: List[Tuple[str, Dict[str, Any]]], archive: bool):
+    """Render a job's documents and write the result file."""
+    update_job(session_factory, job_id, status=RUNNING)
+    os.makedirs(JOB_RESULT_DIR, exist_ok=True)
+    path = os.path.join(JOB_RESULT_DIR, f"{job_id}.{'zip' if archive else fmt}")
+    try:
+        with open(path, "wb") as out:
+            if archive:
+                for done, chunk in enumerate(stream_reports_zip(fmt, files), start=1):
+                    out.write(chunk)
+                    if done <= len(files):
+                        update_job(session_factory, job_id, progress=done)
+            else:
+                _, report_data = files[0]
+                out.write(render(fmt, report_data))
+        update_job(session_factory, job_id, status=DONE, progress=len(files),
+                   result_path=path, finished_at=datetime.utcnow())
+    except Exception as exc:
+        if os.path.exists(path):
+            os.remove(path)
+        update_job(session_factory, job_id, status=FAILED, error=str(exc),
+                   finished_at=datetime.utcnow())
+
+
+def submit_job(session_factory: Callable[[], Session], job: ReportJob,
+               files: List[Tuple[str, Dict[str, Any]]], archive: bool):
+    """Queue a job's rendering on the worker pool."""
+    get_job_executor().submit(run_job, session_factory, job.id, job.format, files, archive)
+
+
+def cleanup_expired_jobs(db: Session, now: datetime = None) -> int:
+    """Delete jobs older than the TTL together with their result files."""
+    cutoff = (now or datetime.utcnow()) - JOB_RESULT_TTL
+    expired = db.query(ReportJob).filter(ReportJob.created_at < cutoff).all()
+    for job in expired:
+        if job.result_path and os.path.exists(job.result_path):
+            os.remove(job.result_path)
+        db.delete(job)
+    db.commit()
+    return len(expired)
+
+
+def fail_interrupted_jobs(db: Session, now: datetime = None) -> int:
+    """Mark queued or running jobs whose owning process stopped as failed.
+
+    An owner is considered gone once its heartbeat is older than
+    JOB_HEARTBEAT_TIMEOUT, so jobs of live sibling workers are kept.
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - JOB_HEARTBEAT_TIMEOUT
+    count = db.query(ReportJob).filter(
+        ReportJob.status.in_([QUEUED, RUNNING]),
+        or_(ReportJob.heartbeat_at.is_(None), ReportJob.heartbeat_at < cutoff)
+    ).update(
+        {"status": FAILED, "error": "Interrupted by server restart", "finished_at": now},
+        synchronize_session=False
+    )
+    db.commit()
+    return count
+
+
+def beat(session_factory: Callable[[], Session]):
+    """Confirm this process's unfinished jobs and fail those of stopped processes."""
+    db = session_factory()
+    try:
+        db.query(ReportJob).filter(
+            ReportJob.owner == JOB_OWNER, ReportJob.status.in_([QUEUED, RUNNING])
+        ).update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+        fail_interrupted_jobs(db)
+    finally:
+        db.close()
+
+
+def start_job_heartbeat(session_factory: Callable[[], Session]):
+    """Run beat() every JOB_HEARTBEAT_INTERVAL seconds in a daemon thread."""
+    global _heartbeat_stop
+    if _heartbeat_stop is not None:
+        return
+    stop = _heartbeat_stop = threading.Event()
+
+    def run():
+        while not stop.wait(JOB_HEARTBEAT_INTERVAL):
+            try:
+                beat(session_factory)
+            except Exception:
+                logger.exception("Report job heartbeat failed")
+
+    threading.Thread(target=run, name="report-job-heartbeat", daemon=True).start()
@@ -1,41 +1,174 @@
 """PDF report generator service."""
 from io import BytesIO
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO, Iterator, List
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+from reportlab.platypus.tableofcontents import TableOfContents
+
+
+class LazyStory:
+    """List-like view over a flowable iterator, as consumed by doc.build.
+
+    platypus only works on the head of the story: it reads a few flowables
+    ahead for keepWithNext, deletes handled ones and pushes split remainders
+    back to the front. Flowables are therefore created on demand, and only a
+    small window of them is alive at a time. This lowers peak memory by a
+    constant factor, not to a bound: the canvas keeps every finished page
+    until save(), so memory still grows with the length of the report.
+    """
+
+    def __init__(self, flowables: Iterator, lookahead: int = 16):
+        self._flowables = iter(flowables)
+        self._buffer = []
+        self.lookahead = lookahead
+
+    def _fill(self, size: int):
+        while len(self._buffer) < size:
+            try:
+                self._buffer.append(next(self._flowables))
+            except StopIteration:
+                return
+
+    def _fill_for(self, index):
+        if isinstance(index, slice):
+            if index.stop is None:
+                self._buffer.extend(self._flowables)
+            else:
+                self._fill(index.stop)
+        else:
+            self._fill(index + 1)
+
+    def __len__(self) -> int:
+        self._fill(self.lookahead)
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        self._fill_for(index)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._fill_for(index)
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        self._fill_for(index)
+        del self._buffer[index]
+
+    def insert(self, index: int, value):
+        self._buffer.insert(index, value)
+
+
+class ClassReportTemplate(SimpleDocTemplate):
+    """Document template that lists marked flowables in the table of contents."""
+
+    def afterFlowable(self, flowable):
+        toc_key = getattr(flowable, 'toc_key', None)
+        if toc_key is None:
+            return
+        text = flowable.toc_text
+        self.canv.bookmarkPage(toc_key)
+        self.canv.addOutlineEntry(text, toc_key, level=0)
+        self.notify('TOCEntry', (0, text, self.page, toc_key))
+
+
+class PdfReportRenderer:
+    """Renders PDF reports with paragraph styles built once per process."""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=16)
+        self.heading_style = styles['Heading2']
+        self.body_style = styles['Normal']
+        self.toc_style = ParagraphStyle('TOCEntry', parent=styles['Normal'], leading=16)
+
+    def iter_story(self, report_data: Dict[str, Any]) -> Iterator:
+        """Yield the platypus flowables for one pupil's report."""
+        # Title
+        title = f"Development Report: {report_data['pupil_name']}"
+        yield Paragraph(title, self.title_style)
+        yield Spacer(1, 0.5*cm)
+
+        # Period
+        period = f"Period: {report_data['start_date']} - {report_data['end_date']}"
+        yield Paragraph(period, self.body_style)
+        yield Spacer(1, 0.5*cm)
+
+        # Entries by category
+        for category, entries in report_data.get('entries_by_category', {}).items():
+            yield Paragraph(category, self.heading_style)
+            for entry in entries:
+                entry_text = f"[{entry['date']}] {entry['text']}"
+                if entry.get('grade'):
+                    entry_text += f" (Grade: {entry['grade']})"
+                yield Paragraph(entry_text, self.body_style)
+            yield Spacer(1, 0.3*cm)
+
+    def build_story(self, report_data: Dict[str, Any]) -> List:
+        """Build the platypus flowables for one pupil's report."""
+        return list(self.iter_story(report_data))
+
+    def render_to_file(self, report_data: Dict[str, Any], out: BinaryIO):
+        """Render one report into a binary file, creating flowables lazily."""
+        doc = SimpleDocTemplate(out, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+        doc.build(LazyStory(self.iter_story(report_data)))
+
+    def build_class_story(self, class_data: Dict[str, Any]) -> List:
+        """Build one story with a table of contents and a section per pupil."""
+        toc = TableOfContents()
+        toc.levelStyles = [self.toc_style]
+        story = [
+            Paragraph(f"Class Report: {class_data['class_name']}", self.title_style),
+            Spacer(1, 0.5*cm),
+            Paragraph(f"Period: {class_data['start_date']} - {class_data['end_date']}",
+                      self.body_style),
+            Spacer(1, 0.5*cm),
+            toc,
+        ]
+        for report_data in class_data['reports']:
+            section = self.build_story(report_data)
+            section[0].toc_key = f"pupil-{report_data['pupil_id']}"
+            section[0].toc_text = report_data['pupil_name']
+            story.append(PageBreak())
+            story.extend(section)
+        return story
+
+    def render_class_to_file(self, class_data: Dict[str, Any], out: BinaryIO):
+        """Render a whole class into one PDF; the contents need a second pass."""
+        doc = ClassReportTemplate(out, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
+        doc.multiBuild(self.build_class_story(class_data))
+
+    def render(self, report_data: Dict[str, Any]) -> BytesIO:
+        """Render one report into a PDF buffer."""
+        buffer = BytesIO()
+        self.render_to_file(report_data, buffer)
+        buffer.seek(0)
+        return buffer
+
+
+_renderer = None
+
+
+def get_pdf_renderer() -> PdfReportRenderer:
+    """Return the per-process PDF renderer, creating it on first use."""
+    global _renderer
+    if _renderer is None:
+        _renderer = PdfReportRenderer()
+    return _renderer
 
 
 def generate_pdf_report(report_data: Dict[str, Any]) -> BytesIO:
     """Generate a PDF report for a pupil."""
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Title
-    title_style = ParagraphStyle('Title', parent=styles['Heading1'], fontSize=16)
-    title = f"Development Report: {report_data['pupil_name']}"
-    story.append(Paragraph(title, title_style))
-    story.append(Spacer(1, 0.5*cm))
-
-    # Period
-    period = f"Period: {report_data['start_date']} - {report_data['end_date']}"
-    story.append(Paragraph(period, styles['Normal']))
-    story.append(Spacer(1, 0.5*cm))
-
-    # Entries by category
-    for category, entries in report_data.get('entries_by_category', {}).items():
-        story.append(Paragraph(category, styles['Heading2']))
-        for entry in entries:
-            entry_text = f"[{entry['date']}] {entry['text']}"
-            if entry.get('grade'):
-                entry_text += f" (Grade: {entry['grade']})"
-            story.append(Paragraph(entry_text, styles['Normal']))
-        story.append(Spacer(1, 0.3*cm))
-
-    doc.build(story)
-    buffer.seek(0)
-    return buffer
+    return get_pdf_renderer().render(report_data)
+
+
+def write_pdf_report(report_data: Dict[str, Any], out: BinaryIO):
+    """Write a PDF report for a pupil into a binary file."""
+    get_pdf_renderer().render_to_file(report_data, out)
+
+
+def write_class_pdf_report(class_data: Dict[str, Any], out: BinaryIO):
+    """Write one PDF with a section for every pupil of a class into a binary file."""
+    get_pdf_renderer().render_class_to_file(class_data, out)
@@ -0,0 +1,77 @@
+"""In-process read-through cache for small, rarely changing reference tables."""
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from models import Category, DataVersion, SchoolYear
+
+REFERENCE_CACHE_TTL = float(os.environ.get("PUPIL_TRACKER_REFERENCE_CACHE_TTL", "30"))
+
+
+class Snapshot(NamedTuple):
+    """One consistent load of a reference table."""
+    loaded_at: float
+    version: int
+    rows: List[Row]
+    by_id: Dict[int, Row]
+
+
+class ReferenceCache:
+    """Rows of one reference table, loaded in one go and reused across requests.
+
+    Rows are immutable Core rows, so they can be shared between threads.
+    Writes in this process call invalidate(), which waits for a running load
+    so that a load begun before the write cannot be stored after it; other
+    worker processes pick up changes once REFERENCE_CACHE_TTL has passed.
+    """
+
+    def __init__(self, model, scope: str):
+        self.model = model
+        self.scope = scope
+        self._lock = threading.Lock()
+        self._snapshot: Optional[Snapshot] = None
+
+    def _is_fresh(self, snapshot: Optional[Snapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at < REFERENCE_CACHE_TTL
+
+    def _load(self, db: Session) -> Snapshot:
+        version = db.scalar(
+            select(DataVersion.version).where(DataVersion.scope == self.scope,
+                                              DataVersion.key == 0)
+        ) or 0
+        rows = db.execute(
+            select(*self.model.__table__.columns).order_by(self.model.id)
+        ).all()
+        return Snapshot(time.monotonic(), version, rows, {row.id: row for row in rows})
+
+    def snapshot(self, db: Session) -> Snapshot:
+        """Return the cached rows, loading them with db if missing or expired."""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                return snapshot
+            self._snapshot = self._load(db)
+            return self._snapshot
+
+    def invalidate(self):
+        """Drop the cached rows after a write to the table."""
+        with self._lock:
+            self._snapshot = None
+
+
+category_cache = ReferenceCache(Category, "categories")
+school_year_cache = ReferenceCache(SchoolYear, "school_years")
+
+
+def invalidate_all():
+    """Drop every reference cache, e.g. after an import."""
+    category_cache.invalidate()
+    school_year_cache.invalidate()
@@ -0,0 +1,289 @@
+"""Rendering of PDF and Word reports in a dedicated, bounded process pool."""
+import itertools
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+from services.pdf_generator import (
+    generate_pdf_report, write_pdf_report, write_class_pdf_report
+)
+from services.word_generator import generate_word_report
+
+RENDER_WORKERS = int(os.environ.get("PUPIL_TRACKER_RENDER_WORKERS", str(os.cpu_count() or 1)))
+RENDER_QUEUE_SIZE = int(os.environ.get("PUPIL_TRACKER_RENDER_QUEUE_SIZE", str(4 * RENDER_WORKERS)))
+RENDER_QUEUE_WAIT = float(os.environ.get("PUPIL_TRACKER_RENDER_QUEUE_WAIT", "10"))
+RENDER_TIMEOUT = int(os.environ.get("PUPIL_TRACKER_RENDER_TIMEOUT", "60"))
+RENDER_MEMORY_LIMIT_MB = int(os.environ.get("PUPIL_TRACKER_RENDER_MEMORY_LIMIT_MB", "1024"))
+RENDER_MAX_TASKS_PER_CHILD = int(os.environ.get("PUPIL_TRACKER_RENDER_MAX_TASKS_PER_CHILD", "200"))
+RENDER_WARMUP = os.environ.get("PUPIL_TRACKER_RENDER_WARMUP", "1") == "1"
+RENDER_POLL_INTERVAL = 0.1
+
+RENDERERS = {
+    "pdf": generate_pdf_report,
+    "docx": generate_word_report,
+}
+
+FILE_RENDERERS = {
+    "pdf": write_pdf_report,
+    "class_pdf": write_class_pdf_report,
+}
+
+
+class RenderQueueFull(Exception):
+    """Raised when no render slot becomes free within RENDER_QUEUE_WAIT."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a render takes longer than RENDER_TIMEOUT."""
+
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+_in_worker = False
+
+
+def init_worker(memory_limit_mb: int):
+    """Apply the per-worker memory ceiling and install the timeout handler."""
+    global _in_worker
+    _in_worker = True
+    if memory_limit_mb and resource is not None:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    if hasattr(signal, "SIGALRM"):
+        signal.signal(signal.SIGALRM, on_render_timeout)
+
+
+def on_render_timeout(signum, frame):
+    """Abort the render running in this worker."""
+    raise RenderTimeout(f"Rendering exceeded {RENDER_TIMEOUT}s")
+
+
+def warm_up() -> int:
+    """No-op task that forces a worker process to start."""
+    return os.getpid()
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """Return the shared render pool, creating it on first use."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(RENDER_MEMORY_LIMIT_MB,),
+                max_tasks_per_child=RENDER_MAX_TASKS_PER_CHILD or None,
+            )
+            _slots = threading.BoundedSemaphore(RENDER_WORKERS + RENDER_QUEUE_SIZE)
+        return _pool
+
+
+def warm_up_render_pool():
+    """Start every worker so the first reports do not pay for spawning."""
+    pool = get_render_pool()
+    for _ in range(RENDER_WORKERS):
+        pool.submit(warm_up)
+
+
+def shutdown_render_pool():
+    """Stop the render pool's worker processes."""
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+            _slots = None
+
+
+@contextmanager
+def render_deadline():
+    """Abort the enclosed render after RENDER_TIMEOUT when running in a worker."""
+    if _in_worker and hasattr(signal, "SIGALRM"):
+        signal.alarm(RENDER_TIMEOUT)
+    try:
+        yield
+    finally:
+        if _in_worker and hasattr(signal, "SIGALRM"):
+            signal.alarm(0)
+
+
+def render_report(fmt: str, report_data: Dict[str, Any]) -> bytes:
+    """Render one report to bytes; runs inside a pool worker."""
+    with render_deadline():
+        return RENDERERS[fmt](report_data).getvalue()
+
+
+def render_report_to_file(fmt: str, report_data: Dict[str, Any], path: str) -> str:
+    """Render one report straight into a file; runs inside a pool worker."""
+    with render_deadline():
+        with open(path, "wb") as out:
+            FILE_RENDERERS[fmt](report_data, out)
+    return path
+
+
+def submit_render(fmt: str, report_data: Dict[str, Any],
+                  queue_wait: Optional[float] = None, path: Optional[str] = None) -> Future:
+    """Queue a render, waiting up to queue_wait seconds for a free slot.
+
+    With a path the worker writes the report there instead of returning bytes.
+    """
+    pool = get_render_pool()
+    slots = _slots
+    wait_for = RENDER_QUEUE_WAIT if queue_wait is None else queue_wait
+    if not slots.acquire(timeout=wait_for):
+        raise RenderQueueFull("Too many reports are being rendered")
+    try:
+        if path is None:
+            future = pool.submit(render_report, fmt, report_data)
+        else:
+            future = pool.submit(render_report_to_file, fmt, report_data, path)
+    except Exception:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+
+def render_backstop() -> float:
+    """Return how long a render may run after it was handed to a worker.
+
+    Workers abort themselves after RENDER_TIMEOUT; this catches hung ones.
+    A future turns running once it is on the pool's call queue, where it
+    may still wait for one render to finish, hence twice the timeout.
+    """
+    return 2 * RENDER_TIMEOUT + 5
+
+
+class RenderWatch:
+    """Tracks since when pending renders are running, ignoring time spent queued."""
+
+    def __init__(self):
+        self.running_since = {}
+
+    def overran(self, futures) -> bool:
+        """Return True if any of the futures has been running past the backstop."""
+        now = time.monotonic()
+        for future in futures:
+            if future.running():
+                started = self.running_since.setdefault(future, now)
+                if now - started > render_backstop():
+                    return True
+        return False
+
+
+def wait_for_render(future: Future):
+    """Wait for a queued render's result.
+
+    Only time after a worker picked the render up counts towards the
+    backstop, so a render that waits behind others is not timed out.
+    """
+    watch = RenderWatch()
+    while True:
+        try:
+            return future.result(timeout=RENDER_POLL_INTERVAL)
+        except FuturesTimeoutError:
+            if watch.overran([future]):
+                future.cancel()
+                raise RenderTimeout(f"Rendering exceeded {RENDER_TIMEOUT}s")
+
+
+def render(fmt: str, report_data: Dict[str, Any], queue_wait: Optional[float] = None) -> bytes:
+    """Render one report in the pool and wait for the bytes."""
+    return wait_for_render(submit_render(fmt, report_data, queue_wait))
+
+
+def render_to_file(fmt: str, report_data: Dict[str, Any], path: str,
+                   queue_wait: Optional[float] = None) -> str:
+    """Render one report in the pool straight into path.
+
+    Used for long reports: the worker writes the document to disk as it is
+    saved instead of shipping the whole file back through a pipe. The
+    report data itself is still pickled to the worker in one piece.
+    """
+    return wait_for_render(
+        submit_render(fmt, report_data, queue_wait, path)
+    )
+
+
+class ZipStreamBuffer:
+    """Write-only, unseekable sink that hands out what ZipFile wrote so far."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        """Return and clear the buffered bytes."""
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def start_stream(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Run a stream up to its first chunk and return it with that chunk put back.
+
+    Errors such as RenderQueueFull are raised here, before a response is
+    started, instead of cutting the stream short.
+    """
+    first = next(chunks, None)
+    return itertools.chain([] if first is None else [first], chunks)
+
+
+def stream_reports_zip(fmt: str, reports: List[Tuple[str, Dict[str, Any]]],
+                       queue_wait: Optional[float] = None) -> Iterator[bytes]:
+    """Render (filename, report_data) pairs in parallel and stream them as a ZIP.
+
+    At most RENDER_WORKERS reports of one archive are in flight at a time,
+    so a large class cannot fill the whole render queue. Files are added
+    in completion order and sent as soon as each one is ready.
+    """
+    todo = iter(reports)
+    pending = {}
+    buffer = ZipStreamBuffer()
+
+    def fill():
+        while len(pending) < RENDER_WORKERS:
+            item = next(todo, None)
+            if item is None:
+                return
+            filename, report_data = item
+            pending[submit_render(fmt, report_data, queue_wait)] = filename
+
+    watch = RenderWatch()
+    try:
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+            fill()
+            while pending:
+                done, _ = wait(pending, timeout=RENDER_POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                if not done:
+                    if watch.overran(pending):
+                        raise RenderTimeout(f"Rendering exceeded {RENDER_TIMEOUT}s")
+                    continue
+                for future in done:
+                    archive.writestr(pending.pop(future), future.result())
+                    yield buffer.pop()
+                fill()
+        yield buffer.pop()
+    finally:
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,92 @@
+"""On-disk LRU cache for rendered report files."""
+import hashlib
+import os
+import tempfile
+from typing import BinaryIO, Callable, Optional
+
+REPORT_CACHE_DIR = os.environ.get("PUPIL_TRACKER_REPORT_CACHE_DIR", "./report_cache")
+REPORT_CACHE_MAX_BYTES = int(
+    os.environ.get("PUPIL_TRACKER_REPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+
+
+def cache_key(*parts) -> str:
+    """Return a stable hex key for the given key parts."""
+    return hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def cache_path(key: str, fmt: str) -> str:
+    """Return the file path a cached report is stored at."""
+    return os.path.join(REPORT_CACHE_DIR, f"{key}.{fmt}")
+
+
+def open_cached(key: str, fmt: str) -> Optional[BinaryIO]:
+    """Open a cached report for reading and mark it recently used, or return None.
+
+    The open file stays readable even if evict() deletes it meanwhile.
+    """
+    path = cache_path(key, fmt)
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+    return handle
+
+
+def bytes_writer(data: bytes) -> Callable[[str], None]:
+    """Return a write function for store_and_open that writes data to the file."""
+    def write(tmp_path: str):
+        with open(tmp_path, "wb") as out:
+            out.write(data)
+    return write
+
+
+def store_and_open(key: str, fmt: str, write: Callable[[str], None]) -> BinaryIO:
+    """Let write fill a temporary file, atomically move it into the cache and return it opened.
+
+    The file is opened before it is moved into the cache, so a concurrent
+    evict() cannot delete it before it is served.
+    """
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = cache_path(key, fmt)
+    fd, tmp_path = tempfile.mkstemp(dir=REPORT_CACHE_DIR, suffix=".tmp")
+    os.close(fd)
+    handle = None
+    try:
+        write(tmp_path)
+        handle = open(tmp_path, "rb")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if handle is not None:
+            handle.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    evict(keep=path)
+    return handle
+
+
+def evict(keep: Optional[str] = None, max_bytes: Optional[int] = None):
+    """Delete least recently used files until the cache fits its size cap."""
+    limit = REPORT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    files = []
+    with os.scandir(REPORT_CACHE_DIR) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
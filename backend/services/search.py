@@ -0,0 +1,192 @@
+"""Full-text search over entries using the entries_fts index."""
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.orm import Session
+
+TERM_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Spellings German users type for the same word; the index folds ä to a.
+GERMAN_VARIANTS = [("ß", "ss"), ("ae", "a"), ("oe", "o"), ("ue", "u")]
+
+SNIPPET_START, SNIPPET_END = "**", "**"
+
+# Matches ranked per entry search; a common word matches a large part of
+# all entries, and ranking every one of them dominates the query.
+SEARCH_CANDIDATES = 1000
+
+# Applied to pupil names in SQL by the pupils_fts triggers and to queries here.
+NAME_FOLDS = [("Ä", "a"), ("ä", "a"), ("Ö", "o"), ("ö", "o"), ("Ü", "u"), ("ü", "u"),
+              ("ẞ", "ss"), ("ß", "ss")]
+
+
+def term_variants(term: str) -> List[str]:
+    """Return a search term together with its German spelling variants."""
+    variants = [term.lower()]
+    for source, target in GERMAN_VARIANTS:
+        for variant in list(variants):
+            if source in variant:
+                variants.append(variant.replace(source, target))
+    if "ss" in variants[0]:
+        variants.append(variants[0].replace("ss", "ß"))
+    return list(dict.fromkeys(variants))
+
+
+def fold_name(name: str) -> str:
+    """Lower-case a name and fold umlauts and ß, as stored in pupils_fts."""
+    folded = name.lower()
+    for source, target in NAME_FOLDS:
+        folded = folded.replace(source, target)
+    return folded
+
+
+def trigrams(word: str) -> List[str]:
+    """Return the three-character substrings of a word."""
+    return [word[i:i + 3] for i in range(len(word) - 2)]
+
+
+def build_match_query(q: str) -> Optional[str]:
+    """Turn user input into an FTS5 query that prefix-matches every word.
+
+    Words are quoted, so FTS5 operators in the input are searched as text.
+    Returns None if the input contains no words.
+    """
+    clauses = []
+    for term in TERM_PATTERN.findall(q):
+        variants = " OR ".join(f'"{variant}"*' for variant in term_variants(term))
+        clauses.append(f"({variants})")
+    return " AND ".join(clauses) or None
+
+
+def search_entries(
+    db: Session,
+    q: str,
+    pupil_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: int = 50,
+    candidates: int = SEARCH_CANDIDATES
+) -> list:
+    """Return the best matching entries by BM25 rank, each with a text snippet.
+
+    Only the newest matches, by entry id, are ranked, at most candidates
+    of them, so a very broad term finds the best of the recent entries
+    instead of ranking every match.
+    """
+    match = build_match_query(q)
+    if match is None:
+        return []
+    conditions = ["entries_fts MATCH :match"]
+    params = {"match": match, "limit": limit, "candidates": max(candidates, limit)}
+    if pupil_id is not None:
+        conditions.append("e.pupil_id = :pupil_id")
+        params["pupil_id"] = pupil_id
+    if class_id is not None:
+        conditions.append("e.pupil_id IN (SELECT id FROM pupils WHERE class_id = :class_id)")
+        params["class_id"] = class_id
+    if start_date is not None:
+        conditions.append("e.date >= :start_date")
+        params["start_date"] = start_date.isoformat()
+    if end_date is not None:
+        conditions.append("e.date <= :end_date")
+        params["end_date"] = end_date.isoformat()
+    stmt = text(
+        "SELECT * FROM ("
+        "SELECT e.id, e.pupil_id, e.category_id, e.date, e.text, e.grade, e.subject, "
+        f"snippet(entries_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 12) AS snippet, "
+        "bm25(entries_fts) AS rank "
+        "FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+        f"WHERE {' AND '.join(conditions)} "
+        "ORDER BY entries_fts.rowid DESC LIMIT :candidates"
+        ") ORDER BY rank LIMIT :limit"
+    )
+    return db.execute(stmt, params).all()
+
+
+def prefix_bounds(prefix: str) -> tuple:
+    """Return (low, high) such that low <= key < high for keys starting with prefix."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def search_pupils(
+    db: Session,
+    q: str,
+    school_year_id: Optional[int] = None,
+    class_id: Optional[int] = None,
+    limit: int = 10
+) -> list:
+    """Return pupils whose names best match q for typeahead.
+
+    Results are filled in up to three rounds, each only if the previous
+    ones found fewer than limit pupils: names where every query word starts
+    a first or last name (an index range scan on pupil_name_keys), names
+    containing every word (trigram match), and finally names sharing
+    trigrams with the query, best BM25 first, to tolerate typos. Words
+    shorter than three characters always have to start a name.
+    """
+    words = [
+        list(dict.fromkeys(fold_name(variant) for variant in term_variants(term)))
+        for term in TERM_PATTERN.findall(q)
+    ]
+    if not words:
+        return []
+    params = {}
+    prefix_conditions, short_conditions, phrases, query_trigrams = [], [], [], set()
+    for i, variants in enumerate(words):
+        ranges = []
+        for j, variant in enumerate(variants):
+            params[f"low_{i}_{j}"], params[f"high_{i}_{j}"] = prefix_bounds(variant)
+            for column in ("k.first_key", "k.last_key"):
+                ranges.append(f"({column} >= :low_{i}_{j} AND {column} < :high_{i}_{j})")
+        condition = f"({' OR '.join(ranges)})"
+        prefix_conditions.append(condition)
+        long_variants = [variant for variant in variants if len(variant) >= 3]
+        if long_variants:
+            phrases.append("(" + " OR ".join(f'"{variant}"' for variant in long_variants) + ")")
+            for variant in long_variants:
+                query_trigrams.update(trigrams(variant))
+        else:
+            short_conditions.append(condition)
+
+    scope = ""
+    if class_id is not None:
+        scope += " AND p.class_id = :class_id"
+        params["class_id"] = class_id
+    if school_year_id is not None:
+        scope += " AND p.class_id IN (SELECT id FROM classes WHERE school_year_id = :school_year_id)"
+        params["school_year_id"] = school_year_id
+
+    rounds = [("pupil_name_keys k JOIN pupils p ON p.id = k.pupil_id",
+               prefix_conditions, "k.last_key, k.first_key", None)]
+    if phrases:
+        fts_from = ("pupils_fts JOIN pupil_name_keys k ON k.pupil_id = pupils_fts.rowid "
+                    "JOIN pupils p ON p.id = k.pupil_id")
+        rounds.append((fts_from, short_conditions + ["pupils_fts MATCH :match"],
+                       "k.last_key, k.first_key", " AND ".join(phrases)))
+        rounds.append((fts_from, short_conditions + ["pupils_fts MATCH :match"],
+                       "bm25(pupils_fts), k.last_key, k.first_key",
+                       " OR ".join(f'"{trigram}"' for trigram in sorted(query_trigrams))))
+
+    found = []
+    for from_clause, conditions, order_by, match in rounds:
+        if len(found) >= limit:
+            break
+        stmt = (
+            "SELECT p.id, p.first_name, p.last_name, p.class_id "
+            f"FROM {from_clause} WHERE {' AND '.join(conditions)}{scope}"
+        )
+        round_params = dict(params, limit=limit - len(found))
+        if match is not None:
+            round_params["match"] = match
+        if found:
+            stmt += " AND p.id NOT IN :found"
+            round_params["found"] = [row.id for row in found]
+        stmt += f" ORDER BY {order_by} LIMIT :limit"
+        statement = text(stmt)
+        if found:
+            statement = statement.bindparams(bindparam("found", expanding=True))
+        found.extend(db.execute(statement, round_params).all())
+    return found
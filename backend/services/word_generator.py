@@ -1,31 +1,116 @@
 """Word document report generator service."""
 from io import BytesIO
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.oxml.ns import qn
+
+
+def style_reference(style, name: str) -> Optional[str]:
+    """Return the style ID a style's w:basedOn, w:next or w:link element points to."""
+    element = style.element.find(qn(f"w:{name}"))
+    return element.get(qn("w:val")) if element is not None else None
+
+
+class WordReportRenderer:
+    """Renders Word reports from a base template read once per process.
+
+    The template is kept as immutable DOCX bytes, so every report starts
+    from an untouched copy. Assigning a paragraph style scans every style
+    definition, so unused built-in styles are dropped from the template;
+    Word recreates built-in styles when they are applied.
+    """
+
+    def __init__(self, template_path: Optional[str] = None):
+        template = Document(template_path)
+        styles = template.styles
+        self.title_style = styles['Title']
+        self.heading_style = styles['Heading 1']
+        self.bullet_style = styles['List Bullet']
+        self.prune_styles(template, [self.title_style, self.heading_style, self.bullet_style])
+        buffer = BytesIO()
+        template.save(buffer)
+        self.template = buffer.getvalue()
+
+    @staticmethod
+    def prune_styles(document, used):
+        """Delete built-in styles that reports never apply, and every reference to them.
+
+        A style stays if it is used, a base of a used style or linked to a
+        kept style. Character styles linked to a dropped paragraph style go
+        with it, and numbering levels stop pointing at dropped styles.
+        """
+        styles = document.styles
+        keep = set()
+        for style in used:
+            while style is not None:
+                keep.add(style.style_id)
+                style = style.base_style
+        links = {style.style_id: style_reference(style, "link") for style in styles}
+        keep.update(links[style_id] for style_id in list(keep) if links[style_id])
+        dropped = {
+            style.style_id for style in styles
+            if style.builtin and style.style_id not in keep
+            and style.type != WD_STYLE_TYPE.LIST
+            and style != styles.default(style.type)
+        }
+        dropped.update(style_id for style_id, link in links.items()
+                       if link in dropped and style_id not in keep)
+        for style in list(styles):
+            if style.style_id in dropped:
+                style.delete()
+                continue
+            for name in ("basedOn", "next", "link"):
+                if style_reference(style, name) in dropped:
+                    style.element.remove(style.element.find(qn(f"w:{name}")))
+        numbering = document.part.numbering_part.element
+        for p_style in numbering.iter(qn("w:pStyle")):
+            if p_style.get(qn("w:val")) in dropped:
+                p_style.getparent().remove(p_style)
+
+    def new_document(self):
+        """Return a fresh document loaded from the base template."""
+        return Document(BytesIO(self.template))
+
+    def render(self, report_data: Dict[str, Any]) -> BytesIO:
+        """Render one report into a DOCX buffer."""
+        doc = self.new_document()
+
+        # Title
+        doc.add_paragraph(f"Development Report: {report_data['pupil_name']}",
+                          style=self.title_style)
+
+        # Period
+        period = f"Period: {report_data['start_date']} - {report_data['end_date']}"
+        doc.add_paragraph(period)
+
+        # Entries by category
+        for category, entries in report_data.get('entries_by_category', {}).items():
+            doc.add_paragraph(category, style=self.heading_style)
+            for entry in entries:
+                entry_text = f"[{entry['date']}] {entry['text']}"
+                if entry.get('grade'):
+                    entry_text += f" (Grade: {entry['grade']})"
+                doc.add_paragraph(entry_text, style=self.bullet_style)
+
+        buffer = BytesIO()
+        doc.save(buffer)
+        buffer.seek(0)
+        return buffer
+
+
+_renderer = None
+
+
+def get_word_renderer() -> WordReportRenderer:
+    """Return the per-process Word renderer, creating it on first use."""
+    global _renderer
+    if _renderer is None:
+        _renderer = WordReportRenderer()
+    return _renderer
 
 
 def generate_word_report(report_data: Dict[str, Any]) -> BytesIO:
     """Generate a Word document report for a pupil."""
-    doc = Document()
-
-    # Title
-    title = doc.add_heading(f"Development Report: {report_data['pupil_name']}", 0)
-
-    # Period
-    period = f"Period: {report_data['start_date']} - {report_data['end_date']}"
-    doc.add_paragraph(period)
-
-    # Entries by category
-    for category, entries in report_data.get('entries_by_category', {}).items():
-        doc.add_heading(category, level=1)
-        for entry in entries:
-            entry_text = f"[{entry['date']}] {entry['text']}"
-            if entry.get('grade'):
-                entry_text += f" (Grade: {entry['grade']})"
-            doc.add_paragraph(entry_text, style='List Bullet')
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    return buffer
+    return get_word_renderer().render(report_data)
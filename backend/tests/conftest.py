@@ -4,27 +4,25 @@ import os
 from datetime import date
 
 import pytest
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("PUPIL_TRACKER_RENDER_WARMUP", "0")
 
-from database import Base, get_db
+from database import Base, get_db, create_db_engine
+from migrations import run_migrations
 from app import app
 
 
 @pytest.fixture(scope="function")
 def test_db():
     """Create a fresh test database for each test."""
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    engine = create_db_engine("sqlite:///:memory:", poolclass=StaticPool)
     TestingSessionLocal = sessionmaker(bind=engine)
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
     db = TestingSessionLocal()
     try:
         yield db
@@ -48,6 +46,24 @@ def client(test_db):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def report_cache_dir(tmp_path, monkeypatch):
+    """Keep rendered report cache files in a temporary directory."""
+    from services import report_cache
+    cache_dir = tmp_path / "report_cache"
+    monkeypatch.setattr(report_cache, "REPORT_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def reference_caches():
+    """Start every test with empty reference caches."""
+    from services import reference_cache
+    reference_cache.invalidate_all()
+    yield
+    reference_cache.invalidate_all()
+
+
 @pytest.fixture
 def sample_school_year():
     """Return sample school year data."""
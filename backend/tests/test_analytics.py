@@ -0,0 +1,84 @@
+"""Tests for grade analytics API endpoints."""
+import statistics
+
+from services.grades import grade_values
+
+
+def create_graded_entries(client):
+    """Helper to create two classes with graded entries; returns (year_id, class_ids)."""
+    year_id = client.post("/school_years", json={
+        "name": "2024/2025", "start_date": "2024-09-01", "end_date": "2025-07-31",
+        "is_active": True
+    }).json()["id"]
+    cat_id = client.post("/categories", json={
+        "name_de": "Test", "name_en": "Test", "is_predefined": False
+    }).json()["id"]
+    class_ids = []
+    for name, grades in [("1A", ["1", "2-", "Gut", "3+"]), ("1B", ["4", "5", "sehr gut", "A"])]:
+        class_id = client.post("/classes", json={"name": name, "school_year_id": year_id}).json()["id"]
+        pupil_id = client.post("/pupils", json={
+            "first_name": "Max", "last_name": name, "class_id": class_id
+        }).json()["id"]
+        for i, grade in enumerate(grades):
+            client.post("/entries", json={
+                "pupil_id": pupil_id, "category_id": cat_id, "date": f"2024-{10 + i % 2}-01",
+                "text": "Test", "grade": grade, "subject": "Mathe" if i % 2 else "Deutsch"
+            })
+        class_ids.append(class_id)
+    return year_id, class_ids
+
+
+def test_grade_values():
+    """Test numeric values of German grades with tendencies and text grades."""
+    values = grade_values()
+    assert values["2+"] == 1.7
+    assert values["2-"] == values["2−"] == 2.3
+    assert values["ungenügend"] == 6.0
+    assert "6-" not in values
+
+
+def test_grade_analytics_summary(client):
+    """Test distribution, mean and quartiles over a school year."""
+    year_id, _ = create_graded_entries(client)
+    response = client.get("/analytics/grades", params={"school_year_id": year_id})
+    assert response.status_code == 200
+    body = response.json()
+    grades = [1.0, 2.3, 2.0, 2.7, 4.0, 5.0, 1.0]
+    summary = body["summary"]
+    assert summary["count"] == len(grades)
+    assert summary["mean"] == round(statistics.mean(grades), 2)
+    assert summary["median"] == statistics.median(grades)
+    assert [summary["p25"], summary["p75"]] == [
+        round(q, 2) for q in statistics.quantiles(grades, n=4, method="inclusive")[::2]
+    ]
+    assert summary["histogram"] == {"1": 2, "2": 2, "3": 1, "4": 1, "5": 1, "6": 0}
+    assert [point["month"] for point in body["trend"]] == ["2024-10", "2024-11"]
+    assert body["groups"] == []
+
+
+def test_grade_analytics_grouped(client):
+    """Test grouping by class and filtering by subject."""
+    year_id, class_ids = create_graded_entries(client)
+    response = client.get("/analytics/grades", params={"group_by": "class"})
+    groups = {group["key"]: group["summary"] for group in response.json()["groups"]}
+    assert groups[class_ids[0]]["count"] == 4
+    assert groups[class_ids[1]]["mean"] == round((4 + 5 + 1) / 3, 2)
+
+    response = client.get("/analytics/grades", params={"subject": "Mathe", "group_by": "subject"})
+    assert [group["key"] for group in response.json()["groups"]] == ["Mathe"]
+    assert response.json()["summary"]["count"] == 3
+
+
+def test_grade_analytics_empty(client):
+    """Test analytics without graded entries."""
+    response = client.get("/analytics/grades", params={"class_id": 999})
+    assert response.status_code == 200
+    assert response.json()["summary"] == {
+        "count": 0, "mean": None, "p25": None, "median": None, "p75": None,
+        "histogram": {str(grade): 0 for grade in range(1, 7)}
+    }
+
+
+def test_grade_analytics_rejects_unknown_group(client):
+    """Test that only class, category and subject can be grouped by."""
+    assert client.get("/analytics/grades", params={"group_by": "pupil"}).status_code == 422
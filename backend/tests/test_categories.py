@@ -1,4 +1,5 @@
 """Tests for categories API endpoints."""
+from sqlalchemy import event
 
 
 def test_create_category(client, sample_category):
@@ -76,3 +77,78 @@ def test_cannot_delete_predefined_category(client):
 
     response = client.delete(f"/categories/{cat_id}")
     assert response.status_code == 403
+
+
+def test_get_categories_conditional(client, sample_category):
+    """Test that unchanged categories are answered with 304 Not Modified."""
+    first = client.get("/categories")
+    etag = first.headers["etag"]
+    again = client.get("/categories", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["etag"] == etag
+    assert again.content == b""
+
+    client.post("/categories", json=sample_category)
+    changed = client.get("/categories", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert client.get("/categories?predefined_only=true").headers["etag"] != changed.headers["etag"]
+
+
+def test_categories_served_from_cache(client, test_db, sample_category):
+    """Test that repeated reads skip the database until a category changes."""
+    statements = []
+    event.listen(test_db.get_bind(), "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    cat_id = client.post("/categories", json=sample_category).json()["id"]
+    client.get("/categories")
+    statements.clear()
+
+    assert client.get(f"/categories/{cat_id}").json()["name_en"] == sample_category["name_en"]
+    assert len(client.get("/categories").json()) >= 1
+    assert statements == []
+
+    client.put(f"/categories/{cat_id}", json={**sample_category, "name_en": "Renamed"})
+    assert client.get(f"/categories/{cat_id}").json()["name_en"] == "Renamed"
+
+
+def test_category_cache_expires(client, test_db, sample_category, monkeypatch):
+    """Test that writes from other processes show up once the TTL has passed."""
+    from models import Category
+    from services import reference_cache
+    client.get("/categories")
+    test_db.add(Category(**sample_category))
+    test_db.commit()
+    assert sample_category["name_en"] not in {c["name_en"] for c in client.get("/categories").json()}
+
+    monkeypatch.setattr(reference_cache, "REFERENCE_CACHE_TTL", 0)
+    assert sample_category["name_en"] in {c["name_en"] for c in client.get("/categories").json()}
+
+
+def test_category_cache_invalidate_waits_for_load(monkeypatch):
+    """Test that an invalidation during a load drops the loaded rows afterwards."""
+    import threading
+    from services.reference_cache import ReferenceCache, Snapshot
+    from models import Category
+
+    cache = ReferenceCache(Category, "categories")
+    loading, release = threading.Event(), threading.Event()
+
+    def load(db):
+        loading.set()
+        release.wait(5)
+        return Snapshot(0.0, 1, [], {})
+
+    monkeypatch.setattr(cache, "_load", load)
+    loader = threading.Thread(target=cache.snapshot, args=(None,))
+    loader.start()
+    loading.wait(5)
+    invalidator = threading.Thread(target=cache.invalidate)
+    invalidator.start()
+    invalidator.join(0.1)
+    assert invalidator.is_alive()
+
+    release.set()
+    loader.join(5)
+    invalidator.join(5)
+    assert cache._snapshot is None
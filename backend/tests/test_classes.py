@@ -12,6 +12,13 @@ def test_create_class(client, sample_school_year, sample_class):
     assert response.json()["name"] == sample_class["name"]
 
 
+def test_create_class_unknown_school_year(client, sample_class):
+    """Test creating a class in a non-existent school year."""
+    response = client.post("/classes", json={**sample_class, "school_year_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "School year not found"
+
+
 def test_get_classes(client, sample_school_year, sample_class):
     """Test getting list of classes."""
     year_resp = client.post("/school_years", json=sample_school_year)
@@ -60,6 +67,17 @@ def test_update_class(client, sample_school_year, sample_class):
     assert response.json()["name"] == "Class 2B"
 
 
+def test_update_class_unknown_school_year(client, sample_school_year, sample_class):
+    """Test moving a class to a non-existent school year."""
+    year_id = client.post("/school_years", json=sample_school_year).json()["id"]
+    class_data = {**sample_class, "school_year_id": year_id}
+    class_id = client.post("/classes", json=class_data).json()["id"]
+
+    response = client.put(f"/classes/{class_id}", json={**class_data, "school_year_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "School year not found"
+
+
 def test_delete_class(client, sample_school_year, sample_class):
     """Test deleting a class."""
     year_resp = client.post("/school_years", json=sample_school_year)
@@ -84,3 +102,101 @@ def test_get_classes_by_school_year(client, sample_school_year, sample_class):
     response = client.get(f"/classes?school_year_id={year_id}")
     assert response.status_code == 200
     assert len(response.json()) == 1
+
+
+def create_class_with_pupils(client, sample_school_year, sample_class, sample_category, names):
+    """Helper to create a class with pupils and a category."""
+    year_id = client.post("/school_years", json=sample_school_year).json()["id"]
+    class_id = client.post("/classes", json={**sample_class, "school_year_id": year_id}).json()["id"]
+    pupil_ids = [
+        client.post("/pupils", json={"first_name": name, "last_name": "Muster",
+                                     "class_id": class_id}).json()["id"]
+        for name in names
+    ]
+    cat_id = client.post("/categories", json=sample_category).json()["id"]
+    return class_id, pupil_ids, cat_id
+
+
+def test_create_class_entries(client, sample_school_year, sample_class, sample_category,
+                              sample_entry):
+    """Test recording one entry for every pupil of a class."""
+    class_id, pupil_ids, cat_id = create_class_with_pupils(
+        client, sample_school_year, sample_class, sample_category, ["Max", "Erika", "Anna"]
+    )
+    response = client.post(f"/classes/{class_id}/entries",
+                           json={**sample_entry, "category_id": cat_id})
+    assert response.status_code == 201
+    assert response.json()["created"] == 3
+    entries = client.get("/entries").json()
+    assert sorted(e["pupil_id"] for e in entries) == sorted(pupil_ids)
+    assert {e["text"] for e in entries} == {sample_entry["text"]}
+
+    response = client.post(f"/classes/{class_id}/entries", json={
+        **sample_entry, "category_id": cat_id, "exclude_pupil_ids": pupil_ids[:1]
+    })
+    assert response.json()["created"] == 2
+    response = client.post(f"/classes/{class_id}/entries", json={
+        **sample_entry, "category_id": cat_id, "include_pupil_ids": pupil_ids[:1]
+    })
+    assert response.json()["created"] == 1
+    assert client.get(f"/entries/{response.json()['entry_ids'][0]}").json()["pupil_id"] == pupil_ids[0]
+
+
+def test_create_class_entries_errors(client, sample_school_year, sample_class, sample_category,
+                                     sample_entry):
+    """Test class-wide entries for unknown classes, categories and conflicting filters."""
+    class_id, pupil_ids, cat_id = create_class_with_pupils(
+        client, sample_school_year, sample_class, sample_category, ["Max"]
+    )
+    entry = {**sample_entry, "category_id": cat_id}
+    assert client.post("/classes/999/entries", json=entry).status_code == 404
+    assert client.post(f"/classes/{class_id}/entries",
+                       json={**entry, "category_id": 999}).status_code == 404
+    response = client.post(f"/classes/{class_id}/entries", json={
+        **entry, "include_pupil_ids": pupil_ids, "exclude_pupil_ids": pupil_ids
+    })
+    assert response.status_code == 400
+
+
+def test_get_class_overview(client, sample_school_year, sample_class, sample_category):
+    """Test per-pupil category counts, last entry date and latest grade."""
+    class_id, pupil_ids, cat_id = create_class_with_pupils(
+        client, sample_school_year, sample_class, sample_category, ["Max", "Erika"]
+    )
+    other_cat = client.post("/categories", json={**sample_category, "name_en": "Other"}).json()["id"]
+    for cat, day, grade in [(cat_id, "2024-10-01", "2"), (cat_id, "2024-11-01", None),
+                            (other_cat, "2024-10-15", "1-"), (other_cat, "2024-09-01", "3")]:
+        client.post("/entries", json={"pupil_id": pupil_ids[0], "category_id": cat,
+                                      "date": day, "text": "Entry", "grade": grade})
+
+    response = client.get(f"/classes/{class_id}/overview")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["class_name"] == sample_class["name"]
+    max_row, erika_row = sorted(body["pupils"], key=lambda p: p["pupil_id"])
+    assert max_row["entry_counts"] == {str(cat_id): 2, str(other_cat): 2}
+    assert max_row["total_entries"] == 4
+    assert max_row["last_entry_date"] == "2024-11-01"
+    assert max_row["latest_grade"] == "1-"
+    assert erika_row == {"pupil_id": pupil_ids[1], "first_name": "Erika", "last_name": "Muster",
+                         "entry_counts": {}, "total_entries": 0,
+                         "last_entry_date": None, "latest_grade": None}
+
+
+def test_get_class_overview_not_found(client):
+    """Test overview for non-existent class."""
+    assert client.get("/classes/999/overview").status_code == 404
+
+
+def test_get_class_overview_inactive_since(client, sample_school_year, sample_class, sample_category):
+    """Test listing only pupils without recent entries."""
+    class_id, pupil_ids, cat_id = create_class_with_pupils(
+        client, sample_school_year, sample_class, sample_category, ["Max", "Erika", "Paul"]
+    )
+    for pupil_id, day in [(pupil_ids[0], "2024-09-01"), (pupil_ids[1], "2024-11-01")]:
+        client.post("/entries", json={"pupil_id": pupil_id, "category_id": cat_id,
+                                      "date": day, "text": "Entry"})
+
+    response = client.get(f"/classes/{class_id}/overview", params={"inactive_since": "2024-10-01"})
+    assert response.status_code == 200
+    assert {p["pupil_id"] for p in response.json()["pupils"]} == {pupil_ids[0], pupil_ids[2]}
@@ -0,0 +1,43 @@
+"""Tests for the database engine profile."""
+import sys
+import os
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import create_db_engine, is_memory_url, BUSY_TIMEOUT_MS
+
+
+def test_file_engine_uses_wal(tmp_path):
+    """Test that file databases are opened in WAL mode."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+    engine.dispose()
+
+
+def test_engine_sets_connection_pragmas(tmp_path):
+    """Test that busy timeout and foreign keys are set on connect."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == BUSY_TIMEOUT_MS
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    engine.dispose()
+
+
+def test_file_engine_pool_settings(tmp_path):
+    """Test that pool settings are passed through to the engine."""
+    engine = create_db_engine(
+        f"sqlite:///{tmp_path / 'test.db'}", pool_size=3, max_overflow=2
+    )
+    assert engine.pool.size() == 3
+    engine.dispose()
+
+
+def test_is_memory_url():
+    """Test detection of in-memory database URLs."""
+    assert is_memory_url("sqlite:///:memory:")
+    assert is_memory_url("sqlite://")
+    assert not is_memory_url("sqlite:///./pupil_tracker.db")
@@ -1,6 +1,12 @@
 """Tests for entries API endpoints."""
+import base64
+import json
 from datetime import date
 
+import pytest
+
+from services.search import search_entries
+
 
 def create_test_pupil_and_category(client, sample_school_year, sample_class, sample_pupil):
     """Helper to create prerequisite data."""
@@ -27,6 +33,20 @@ def test_create_entry(client, sample_school_year, sample_class, sample_pupil, sa
     assert response.json()["text"] == sample_entry["text"]
 
 
+def test_create_entry_unknown_references(client, sample_school_year, sample_class, sample_pupil,
+                                         sample_entry):
+    """Test creating an entry for a non-existent pupil or category."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    response = client.post("/entries", json={**sample_entry, "pupil_id": 999, "category_id": cat_id})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Pupil not found"
+    response = client.post("/entries", json={**sample_entry, "pupil_id": pupil_id, "category_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Category not found"
+
+
 def test_get_entries(client, sample_school_year, sample_class, sample_pupil, sample_entry):
     """Test getting list of entries."""
     pupil_id, cat_id = create_test_pupil_and_category(
@@ -75,6 +95,23 @@ def test_update_entry(client, sample_school_year, sample_class, sample_pupil, sa
     assert response.json()["text"] == "Updated text"
 
 
+def test_update_entry_unknown_references(client, sample_school_year, sample_class, sample_pupil,
+                                         sample_entry):
+    """Test moving an entry to a non-existent pupil or category."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    entry_data = {**sample_entry, "pupil_id": pupil_id, "category_id": cat_id}
+    entry_id = client.post("/entries", json=entry_data).json()["id"]
+
+    response = client.put(f"/entries/{entry_id}", json={**entry_data, "pupil_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Pupil not found"
+    response = client.put(f"/entries/{entry_id}", json={**entry_data, "category_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Category not found"
+
+
 def test_delete_entry(client, sample_school_year, sample_class, sample_pupil, sample_entry):
     """Test deleting an entry."""
     pupil_id, cat_id = create_test_pupil_and_category(
@@ -112,3 +149,240 @@ def test_get_entries_by_category(client, sample_school_year, sample_class, sampl
     response = client.get(f"/entries?category_id={cat_id}")
     assert response.status_code == 200
     assert len(response.json()) == 1
+
+
+def test_get_entries_paginated(client, sample_school_year, sample_class, sample_pupil, sample_entry):
+    """Test paging through entries ordered by date and id."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    for day in ["2024-10-03", "2024-10-01", "2024-10-02", "2024-10-01", "2024-10-05"]:
+        entry_data = {**sample_entry, "pupil_id": pupil_id, "category_id": cat_id, "date": day}
+        client.post("/entries", json=entry_data)
+
+    seen = []
+    response = client.get("/entries?limit=2")
+    while True:
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        seen.extend((e["date"], e["id"]) for e in response.json())
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+        assert 'rel="next"' in response.headers["link"]
+        response = client.get(f"/entries?limit=2&cursor={cursor}")
+
+    assert len(seen) == 5
+    assert seen == sorted(seen)
+
+
+def test_get_entries_invalid_cursor(client):
+    """Test that a malformed cursor is rejected."""
+    response = client.get("/entries?limit=2&cursor=not-a-cursor")
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("values", [
+    ["2024-01-01", {"a": 1}],
+    ["2024-01-01", "5"],
+    ["2024-01-01", True],
+    [20240101, 5],
+])
+def test_get_entries_cursor_with_wrong_value_types(client, values):
+    """Test that cursor values must match the types of the sort columns."""
+    cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+    response = client.get(f"/entries?limit=2&cursor={cursor}")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_create_entries_batch(client, sample_school_year, sample_class, sample_pupil, sample_entry):
+    """Test creating many entries in one request."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    entry_data = {**sample_entry, "pupil_id": pupil_id, "category_id": cat_id}
+    response = client.post("/entries/batch", json=[entry_data, {**entry_data, "text": "Second"}])
+    assert response.status_code == 201
+    body = response.json()
+    assert body["created"] == 2
+    assert [r["status"] for r in body["results"]] == [201, 201]
+    ids = [r["id"] for r in body["results"]]
+    assert client.get(f"/entries/{ids[1]}").json()["text"] == "Second"
+
+
+def test_create_entries_batch_reports_item_errors(client, sample_school_year, sample_class,
+                                                  sample_pupil, sample_entry):
+    """Test that failing items are reported while valid ones are created."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    entry_data = {**sample_entry, "pupil_id": pupil_id, "category_id": cat_id}
+    response = client.post("/entries/batch", json=[
+        entry_data,
+        {**entry_data, "date": "not-a-date"},
+        {**entry_data, "pupil_id": 999},
+        {**entry_data, "category_id": 999},
+    ])
+    assert response.status_code == 207
+    body = response.json()
+    assert (body["created"], body["failed"]) == (1, 3)
+    assert [r["status"] for r in body["results"]] == [201, 422, 404, 404]
+    assert body["results"][1]["error"].startswith("date: ")
+    assert len(client.get("/entries").json()) == 1
+
+
+def test_create_entries_batch_item_that_is_not_an_object(client):
+    """Test that a non-object item fails on its own instead of the whole request."""
+    response = client.post("/entries/batch", json=[42, {"text": "No pupil"}])
+    assert response.status_code == 207
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == [422, 422]
+    assert "valid dictionary" in results[0]["error"]
+    assert "pupil_id: Field required" in results[1]["error"]
+
+
+def test_create_entries_batch_documents_item_schema(client):
+    """Test that the batch body is documented as a list of entries."""
+    body = client.get("/openapi.json").json()["paths"]["/entries/batch"]["post"]["requestBody"]
+    assert body["content"]["application/json"]["schema"]["items"] == {
+        "$ref": "#/components/schemas/EntryCreate"
+    }
+
+
+def create_entries(client, pupil_id, cat_id, subjects):
+    """Helper to create one entry per subject."""
+    return [
+        client.post("/entries", json={"pupil_id": pupil_id, "category_id": cat_id,
+                                      "date": "2024-10-01", "text": "Entry",
+                                      "subject": subject}).json()["id"]
+        for subject in subjects
+    ]
+
+
+def test_update_entries_by_filter(client, sample_school_year, sample_class, sample_pupil):
+    """Test changing the subject of all matching entries in one request."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    create_entries(client, pupil_id, cat_id, ["Mathe", "Mathe", "Deutsch"])
+
+    response = client.patch("/entries?subject=Mathe&dry_run=true", json={"subject": "Math"})
+    assert response.json() == {"matched": 2, "dry_run": True}
+    assert "Math" not in {e["subject"] for e in client.get("/entries").json()}
+
+    response = client.patch("/entries?subject=Mathe", json={"subject": "Math"})
+    assert response.status_code == 200
+    assert response.json() == {"matched": 2, "dry_run": False}
+    assert sorted(e["subject"] for e in client.get("/entries").json()) == ["Deutsch", "Math", "Math"]
+
+
+def test_update_entries_validation(client, sample_school_year, sample_class, sample_pupil):
+    """Test that bulk updates need a filter, changes and known references."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    assert client.patch("/entries", json={"subject": "Math"}).status_code == 400
+    assert client.patch(f"/entries?pupil_id={pupil_id}", json={}).status_code == 400
+    assert client.patch(f"/entries?pupil_id={pupil_id}", json={"text": None}).status_code == 400
+    response = client.patch(f"/entries?pupil_id={pupil_id}", json={"category_id": 999})
+    assert response.status_code == 404
+
+
+def test_delete_entries_by_filter(client, sample_school_year, sample_class, sample_pupil):
+    """Test deleting entries by id list and by class."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    ids = create_entries(client, pupil_id, cat_id, ["Mathe", "Mathe", "Deutsch"])
+    class_id = client.get(f"/pupils/{pupil_id}").json()["class_id"]
+
+    response = client.delete(f"/entries?ids={ids[0]}&ids={ids[1]}")
+    assert response.json() == {"matched": 2, "dry_run": False}
+    response = client.delete(f"/entries?class_id={class_id}&dry_run=true")
+    assert response.json() == {"matched": 1, "dry_run": True}
+    response = client.delete(f"/entries?class_id={class_id}")
+    assert response.json()["matched"] == 1
+    assert client.get("/entries").json() == []
+    assert client.delete("/entries").status_code == 400
+
+
+def test_get_entries_by_pupil_conditional(client, sample_school_year, sample_class, sample_pupil,
+                                          sample_entry):
+    """Test that a pupil's entries keep their ETag until that pupil's entries change."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    class_id = client.get(f"/pupils/{pupil_id}").json()["class_id"]
+    other_id = client.post("/pupils", json={**sample_pupil, "first_name": "Erika",
+                                            "class_id": class_id}).json()["id"]
+    etag = client.get(f"/entries?pupil_id={pupil_id}").headers["etag"]
+
+    client.post("/entries", json={**sample_entry, "pupil_id": other_id, "category_id": cat_id})
+    response = client.get(f"/entries?pupil_id={pupil_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post("/entries", json={**sample_entry, "pupil_id": pupil_id, "category_id": cat_id})
+    response = client.get(f"/entries?pupil_id={pupil_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_search_entries(client, sample_school_year, sample_class, sample_pupil):
+    """Test full-text search with prefixes, German spellings and filters."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    entry = {"pupil_id": pupil_id, "category_id": cat_id, "date": "2024-10-01"}
+    client.post("/entries", json={**entry, "text": "Streit in der Pause mit Tom"})
+    reading_id = client.post("/entries", json={**entry, "text": "Übt fleißig Lesen",
+                                               "date": "2025-03-01"}).json()["id"]
+    client.post("/entries", json={**entry, "text": "Hausaufgaben vergessen", "subject": "Lesen"})
+
+    results = client.get("/entries/search?q=stre").json()
+    assert [r["text"] for r in results] == ["Streit in der Pause mit Tom"]
+    assert "**Streit**" in results[0]["snippet"]
+
+    assert len(client.get("/entries/search?q=lesen").json()) == 2
+    assert [r["id"] for r in client.get("/entries/search?q=ueb fleissig").json()] == [reading_id]
+    response = client.get("/entries/search?q=lesen&start_date=2025-01-01")
+    assert [r["id"] for r in response.json()] == [reading_id]
+    assert client.get("/entries/search?q=lesen&pupil_id=999").json() == []
+    assert client.get('/entries/search?q="unbalanced AND (').status_code == 200
+
+
+def test_search_entries_ranks_newest_candidates(client, test_db, sample_school_year,
+                                                 sample_class, sample_pupil):
+    """Test that only the newest matches are ranked for broad terms."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    entry = {"pupil_id": pupil_id, "category_id": cat_id, "date": "2024-10-01"}
+    for _ in range(5):
+        client.post("/entries", json={**entry, "text": "Liest vor"})
+    old_id = client.post("/entries", json={**entry, "text": "Streit Streit Streit"}).json()["id"]
+    new_ids = [
+        client.post("/entries", json={**entry, "text": f"Streit in Stunde {i} und danach"}).json()["id"]
+        for i in range(3)
+    ]
+
+    assert search_entries(test_db, "streit")[0].id == old_id
+    results = search_entries(test_db, "streit", limit=2, candidates=2)
+    assert sorted(r.id for r in results) == new_ids[1:]
+    assert len(search_entries(test_db, "streit", limit=3, candidates=2)) == 3
+
+
+def test_search_index_follows_updates(client, sample_school_year, sample_class, sample_pupil):
+    """Test that edits and deletes are reflected in search results."""
+    pupil_id, cat_id = create_test_pupil_and_category(
+        client, sample_school_year, sample_class, sample_pupil
+    )
+    entry = {"pupil_id": pupil_id, "category_id": cat_id, "date": "2024-10-01",
+             "text": "Streit"}
+    entry_id = client.post("/entries", json=entry).json()["id"]
+    client.put(f"/entries/{entry_id}", json={**entry, "text": "Versöhnung"})
+    assert client.get("/entries/search?q=streit").json() == []
+    assert len(client.get("/entries/search?q=versohnung").json()) == 1
+
+    client.delete(f"/entries/{entry_id}")
+    assert client.get("/entries/search?q=versohnung").json() == []
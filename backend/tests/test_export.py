@@ -1,7 +1,11 @@
 """Tests for export/import API endpoints."""
+import asyncio
+import gzip
 import json
 from datetime import date
 
+from routes import export
+
 
 def create_full_test_data(client):
     """Helper to create full test data."""
@@ -106,3 +110,196 @@ def test_export_empty_database(client):
     assert response.status_code == 200
     data = response.json()
     assert data["school_years"] == []
+
+
+def test_export_json_contents(client):
+    """Test that the streamed JSON export contains every row."""
+    create_full_test_data(client)
+    data = client.get("/export/json").json()
+    assert len(data["pupils"]) == 1
+    assert data["pupils"][0]["first_name"] == "Max"
+    assert data["entries"][0]["text"] == "Test entry"
+
+
+def test_export_ndjson(client):
+    """Test exporting all data as NDJSON records tagged with a type."""
+    create_full_test_data(client)
+    response = client.get("/export/ndjson")
+    assert response.status_code == 200
+    assert "application/x-ndjson" in response.headers["content-type"]
+    records = [json.loads(line) for line in response.text.splitlines()]
+    types = [r["type"] for r in records]
+    assert types.count("pupil") == 1
+    assert types.count("entry") == 1
+    assert types.index("school_year") < types.index("class") < types.index("pupil")
+
+
+def test_export_csv_contents(client):
+    """Test that the CSV export resolves pupil and category names."""
+    create_full_test_data(client)
+    lines = client.get("/export/csv").text.splitlines()
+    assert lines[0] == "Pupil,Category,Date,Text,Grade,Subject"
+    assert lines[1].startswith("Max Mustermann,Test,")
+    assert len(lines) == 2
+
+
+def test_export_csv_german_category_names(client):
+    """Test exporting CSV with German category names."""
+    create_full_test_data(client)
+    client.post("/categories", json={"name_de": "Motorik", "name_en": "Motor Skills"})
+    pupil_id = client.get("/pupils").json()[0]["id"]
+    cat_id = client.get("/categories").json()[-1]["id"]
+    client.post("/entries", json={
+        "pupil_id": pupil_id, "category_id": cat_id, "date": "2024-10-01", "text": "Seil"
+    })
+    text = client.get("/export/csv?lang=de").text
+    assert "Motorik" in text
+    assert "Motor Skills" not in text
+
+
+def test_export_csv_filters(client):
+    """Test filtering the CSV export by class and date range."""
+    create_full_test_data(client)
+    class_id = client.get("/classes").json()[0]["id"]
+    today = date.today()
+
+    lines = client.get(f"/export/csv?class_id={class_id}&start_date={today}").text.splitlines()
+    assert len(lines) == 2
+
+    lines = client.get(f"/export/csv?class_id={class_id + 1}").text.splitlines()
+    assert len(lines) == 1
+
+    year_id = client.get("/school_years").json()[0]["id"]
+    lines = client.get(f"/export/csv?school_year_id={year_id}&end_date=2000-01-01").text.splitlines()
+    assert len(lines) == 1
+
+
+def test_import_json_round_trip(client):
+    """Test that an export re-imports every table with remapped IDs."""
+    create_full_test_data(client)
+    exported = client.get("/export/json").json()
+
+    response = client.post("/import/json", json=exported)
+    assert response.status_code == 200
+    assert response.json()["imported"] == {
+        "school_years": 1, "classes": 1, "pupils": 1, "categories": 1, "entries": 1
+    }
+
+    data = client.get("/export/json").json()
+    assert len(data["entries"]) == 2
+    new_pupil = data["pupils"][1]
+    new_class = data["classes"][1]
+    new_entry = data["entries"][1]
+    assert new_pupil["class_id"] == new_class["id"]
+    assert new_class["school_year_id"] == data["school_years"][1]["id"]
+    assert new_entry["pupil_id"] == new_pupil["id"]
+    assert new_entry["category_id"] == data["categories"][-1]["id"]
+
+
+def test_import_json_reuses_predefined_categories(client):
+    """Test that predefined categories are matched instead of duplicated."""
+    category = {"id": 50, "name_de": "Motorik", "name_en": "Motor Skills", "is_predefined": True}
+    client.post("/categories", json={k: v for k, v in category.items() if k != "id"})
+    before = len(client.get("/categories").json())
+
+    response = client.post("/import/json", json={"categories": [category]})
+    assert response.json()["imported"]["categories"] == 0
+    assert len(client.get("/categories").json()) == before
+
+
+def test_import_json_unknown_reference(client):
+    """Test that an import with dangling references is rolled back."""
+    import_data = {
+        "school_years": [{"id": 1, "name": "2025/2026", "start_date": "2025-09-01",
+                          "end_date": "2026-07-31"}],
+        "classes": [{"id": 1, "name": "2A", "school_year_id": 1}],
+        "pupils": [{"id": 1, "first_name": "A", "last_name": "B", "class_id": 999}],
+    }
+    response = client.post("/import/json", json=import_data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "pupils record 1 references unknown classes id 999"
+    assert client.get("/school_years").json() == []
+
+
+def test_import_ndjson_rejects_unmapped_reference(client):
+    """Test that a reference to an ID outside the import is not taken as a local ID."""
+    create_full_test_data(client)
+    class_id = client.get("/classes").json()[0]["id"]
+    body = json.dumps({"type": "pupil", "first_name": "A", "last_name": "B",
+                       "class_id": class_id}) + "\n"
+
+    response = client.post("/import/ndjson", content=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == f"pupils record references unknown classes id {class_id}"
+    assert len(client.get("/pupils").json()) == 1
+
+
+def test_import_ndjson_round_trip(client):
+    """Test importing an NDJSON export streamed back in."""
+    create_full_test_data(client)
+    body = client.get("/export/ndjson").content
+
+    response = client.post("/import/ndjson", content=body)
+    assert response.status_code == 200
+    assert response.json()["imported"]["entries"] == 1
+    assert response.json()["imported"]["pupils"] == 1
+
+    pupils = client.get("/pupils").json()
+    entries = client.get("/entries").json()
+    assert entries[1]["pupil_id"] == pupils[1]["id"]
+
+
+def test_import_ndjson_gzip_in_batches(client, monkeypatch):
+    """Test a gzip-compressed NDJSON upload split into several batches."""
+    monkeypatch.setattr("services.importer.IMPORT_BATCH_SIZE", 2)
+    lines = [
+        {"type": "school_year", "id": 7, "name": "2025/2026",
+         "start_date": "2025-09-01", "end_date": "2026-07-31"},
+        {"type": "class", "id": 3, "name": "2A", "school_year_id": 7},
+    ] + [
+        {"type": "pupil", "id": i, "first_name": f"P{i}", "last_name": "L", "class_id": 3}
+        for i in range(5)
+    ]
+    body = gzip.compress("".join(json.dumps(line) + "\n" for line in lines).encode())
+
+    response = client.post("/import/ndjson", content=body,
+                           headers={"Content-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.json()["imported"]["pupils"] == 5
+    assert response.json()["batches"] == 5
+    class_id = client.get("/classes").json()[0]["id"]
+    assert len(client.get(f"/pupils?class_id={class_id}").json()) == 5
+
+
+def test_import_ndjson_parses_off_the_event_loop(client, monkeypatch):
+    """Test that records are validated in the threadpool, not on the event loop."""
+    on_loop = []
+
+    def parse(line, line_number):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return parse_record(line, line_number)
+
+    parse_record = export.parse_ndjson_record
+    monkeypatch.setattr(export, "parse_ndjson_record", parse)
+    create_full_test_data(client)
+
+    response = client.post("/import/ndjson", content=client.get("/export/ndjson").content)
+    assert response.status_code == 200
+    assert on_loop and not any(on_loop)
+
+
+def test_import_ndjson_invalid_record(client):
+    """Test that an invalid line aborts the import and reports its number."""
+    body = (
+        json.dumps({"type": "school_year", "name": "2025/2026",
+                    "start_date": "2025-09-01", "end_date": "2026-07-31"}) + "\n"
+        + json.dumps({"type": "pupil", "first_name": "A"}) + "\n"
+    )
+    response = client.post("/import/ndjson", content=body)
+    assert response.status_code == 400
+    assert "line 2" in response.json()["detail"]
+    assert client.get("/school_years").json() == []
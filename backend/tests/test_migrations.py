@@ -0,0 +1,201 @@
+"""Tests for startup schema migrations."""
+import sys
+import os
+import random
+
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base, create_db_engine
+from migrations import rebuild_entry_stats, run_migrations
+
+LEGACY_SCHEMA = [
+    "CREATE TABLE school_years (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, "
+    "start_date DATE NOT NULL, end_date DATE NOT NULL, is_active BOOLEAN)",
+    "CREATE TABLE classes (id INTEGER PRIMARY KEY, name VARCHAR(50) NOT NULL, "
+    "school_year_id INTEGER REFERENCES school_years (id))",
+    "CREATE TABLE pupils (id INTEGER PRIMARY KEY, first_name VARCHAR(100) NOT NULL, "
+    "last_name VARCHAR(100) NOT NULL, class_id INTEGER REFERENCES classes (id))",
+    "CREATE TABLE categories (id INTEGER PRIMARY KEY, name_de VARCHAR(100) NOT NULL, "
+    "name_en VARCHAR(100) NOT NULL, is_predefined BOOLEAN)",
+    "CREATE TABLE entries (id INTEGER PRIMARY KEY, pupil_id INTEGER NOT NULL, "
+    "category_id INTEGER NOT NULL, date DATE NOT NULL, text TEXT NOT NULL, "
+    "grade VARCHAR(10), subject VARCHAR(100))",
+]
+
+
+def create_legacy_engine(tmp_path):
+    """Create a file database with the original, index-less schema."""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+    return engine
+
+
+def index_names(engine, table):
+    """Return the set of index names on a table."""
+    return {ix["name"] for ix in inspect(engine).get_indexes(table)}
+
+
+def test_migration_creates_hot_path_indexes(tmp_path):
+    """Test that missing indexes are added to an existing database."""
+    engine = create_legacy_engine(tmp_path)
+    run_migrations(engine)
+    assert {"ix_entries_pupil_id_date", "ix_entries_category_id_pupil_id"} <= index_names(engine, "entries")
+    assert "ix_pupils_class_id" in index_names(engine, "pupils")
+    assert "ix_classes_school_year_id" in index_names(engine, "classes")
+    engine.dispose()
+
+
+def test_migration_is_idempotent(tmp_path):
+    """Test that running migrations twice is harmless."""
+    engine = create_legacy_engine(tmp_path)
+    run_migrations(engine)
+    before = index_names(engine, "entries")
+    run_migrations(engine)
+    assert index_names(engine, "entries") == before
+    engine.dispose()
+
+
+def test_migration_backfills_search_index(tmp_path):
+    """Test that existing entries become searchable and new ones are indexed."""
+    engine = create_legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO entries (pupil_id, category_id, date, text) "
+                          "VALUES (1, 1, '2024-10-01', 'Streit in der Pause')"))
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO entries (pupil_id, category_id, date, text) "
+                          "VALUES (1, 1, '2024-10-02', 'Liest gern')"))
+        match = "SELECT rowid FROM entries_fts WHERE entries_fts MATCH :q"
+        assert conn.execute(text(match), {"q": "streit"}).scalars().all() == [1]
+        assert conn.execute(text(match), {"q": "liest"}).scalars().all() == [2]
+    engine.dispose()
+
+
+def entry_stats_rows(conn):
+    """Return the entry_stats table as a sorted list."""
+    return conn.execute(text("SELECT * FROM entry_stats ORDER BY pupil_id, category_id")).all()
+
+
+def assert_entry_stats_rebuilt(conn):
+    """Assert that entry_stats is unchanged by a full rebuild."""
+    maintained = entry_stats_rows(conn)
+    rebuild_entry_stats(conn)
+    assert maintained == entry_stats_rows(conn)
+    assert maintained
+
+
+def test_migration_backfills_entry_stats(tmp_path):
+    """Test that entry_stats is filled from existing entries and kept in sync."""
+    engine = create_legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO entries (pupil_id, category_id, date, text, grade) "
+                          "VALUES (1, 1, '2024-10-01', 'A', '2'), (1, 1, '2024-11-01', 'B', NULL)"))
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO entries (pupil_id, category_id, date, text, grade) "
+                          "VALUES (1, 1, '2024-09-01', 'C', '1')"))
+        row = conn.execute(text("SELECT entry_count, first_date, last_date, last_grade "
+                                "FROM entry_stats")).one()
+    assert tuple(row) == (3, "2024-09-01", "2024-11-01", "2")
+    engine.dispose()
+
+
+def test_entry_stats_triggers_match_rebuild(tmp_path):
+    """Test that trigger-maintained entry_stats equal a full rebuild after random writes."""
+    engine = create_legacy_engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    rng = random.Random(7)
+    grades = [None, None, "1", "2-", "3+"]
+    with engine.begin() as conn:
+        for step in range(300):
+            action = rng.random()
+            ids = conn.execute(text("SELECT id FROM entries")).scalars().all()
+            if action < 0.5 or not ids:
+                conn.execute(text(
+                    "INSERT INTO entries (pupil_id, category_id, date, text, grade) "
+                    "VALUES (:p, :c, :d, 'x', :g)"
+                ), {"p": rng.randint(1, 3), "c": rng.randint(1, 2),
+                    "d": f"2024-10-{rng.randint(1, 9):02d}", "g": rng.choice(grades)})
+            elif action < 0.65:
+                conn.execute(text(
+                    "UPDATE entries SET category_id = :c, date = :d, grade = :g WHERE id = :id"
+                ), {"id": rng.choice(ids), "c": rng.randint(1, 2),
+                    "d": f"2024-10-{rng.randint(1, 9):02d}", "g": rng.choice(grades)})
+            elif action < 0.75:
+                conn.execute(text(
+                    "UPDATE entries SET grade = :g WHERE pupil_id = :p AND date >= :d"
+                ), {"p": rng.randint(1, 3), "d": f"2024-10-{rng.randint(1, 9):02d}",
+                    "g": rng.choice(grades)})
+            else:
+                conn.execute(text("DELETE FROM entries WHERE id = :id"), {"id": rng.choice(ids)})
+            if step % 50 == 49:
+                assert_entry_stats_rebuilt(conn)
+        conn.execute(text("DELETE FROM entries WHERE pupil_id = 1 AND date < '2024-10-05'"))
+        assert_entry_stats_rebuilt(conn)
+    engine.dispose()
+
+
+def test_migration_replaces_changed_triggers(tmp_path):
+    """Test that a trigger left by an older version gets the current body."""
+    engine = create_legacy_engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER trg_entry_stats_update"))
+        conn.execute(text(
+            "CREATE TRIGGER trg_entry_stats_update AFTER UPDATE OF grade ON entries "
+            "FOR EACH ROW BEGIN SELECT 1; END"
+        ))
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO entries (pupil_id, category_id, date, text) VALUES (1, 1, '2024-10-01', 'x')"
+        ))
+        conn.execute(text("UPDATE entries SET category_id = 2"))
+        assert_entry_stats_rebuilt(conn)
+        assert [row[:3] for row in entry_stats_rows(conn)] == [(1, 2, 1)]
+    engine.dispose()
+
+
+def test_migration_adds_grade_value(tmp_path):
+    """Test that existing grades get a numeric value and new ones are computed on write."""
+    engine = create_legacy_engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO entries (pupil_id, category_id, date, text, grade) "
+                          "VALUES (1, 1, '2024-10-01', 'A', ' 2- '), (1, 1, '2024-10-02', 'B', 'x')"))
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO entries (pupil_id, category_id, date, text, grade) "
+                          "VALUES (1, 1, '2024-10-03', 'C', 'Sehr gut')"))
+        values = conn.execute(text("SELECT grade_value FROM entries ORDER BY id")).scalars().all()
+    assert values == [2.3, None, 1.0]
+    assert "ix_entries_graded_pupil_id" in index_names(engine, "entries")
+    engine.dispose()
+
+
+def test_migration_replaces_full_grade_value_index(tmp_path):
+    """Test that the graded-entries index is partial, so pupil lookups cannot pick it."""
+    engine = create_legacy_engine(tmp_path)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX ix_entries_pupil_id_grade_value "
+                          "ON entries (pupil_id, grade_value, date, category_id)"))
+    run_migrations(engine)
+    assert "ix_entries_pupil_id_grade_value" not in index_names(engine, "entries")
+    with engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM entries WHERE pupil_id = 1 AND date >= '2024-01-01'"
+        )))
+    assert "ix_entries_graded_pupil_id" not in plan
+    engine.dispose()
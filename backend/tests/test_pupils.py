@@ -16,6 +16,13 @@ def test_create_pupil(client, sample_school_year, sample_class, sample_pupil):
     assert response.json()["first_name"] == sample_pupil["first_name"]
 
 
+def test_create_pupil_unknown_class(client, sample_pupil):
+    """Test creating a pupil in a non-existent class."""
+    response = client.post("/pupils", json={**sample_pupil, "class_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Class not found"
+
+
 def test_get_pupils(client, sample_school_year, sample_class, sample_pupil):
     """Test getting list of pupils."""
     year_resp = client.post("/school_years", json=sample_school_year)
@@ -65,6 +72,19 @@ def test_update_pupil(client, sample_school_year, sample_class, sample_pupil):
     assert response.json()["first_name"] == "Anna"
 
 
+def test_update_pupil_unknown_class(client, sample_school_year, sample_class, sample_pupil):
+    """Test moving a pupil to a non-existent class."""
+    year_resp = client.post("/school_years", json=sample_school_year)
+    class_data = {**sample_class, "school_year_id": year_resp.json()["id"]}
+    class_id = client.post("/classes", json=class_data).json()["id"]
+    pupil_data = {**sample_pupil, "class_id": class_id}
+    pupil_id = client.post("/pupils", json=pupil_data).json()["id"]
+
+    response = client.put(f"/pupils/{pupil_id}", json={**pupil_data, "class_id": 999})
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Class not found"
+
+
 def test_delete_pupil(client, sample_school_year, sample_class, sample_pupil):
     """Test deleting a pupil."""
     year_resp = client.post("/school_years", json=sample_school_year)
@@ -90,3 +110,83 @@ def test_get_pupils_by_class(client, sample_school_year, sample_class, sample_pu
     response = client.get(f"/pupils?class_id={class_id}")
     assert response.status_code == 200
     assert len(response.json()) == 1
+
+
+def test_get_pupils_paginated(client, sample_school_year, sample_class):
+    """Test paging through pupils by id."""
+    year_resp = client.post("/school_years", json=sample_school_year)
+    class_data = {**sample_class, "school_year_id": year_resp.json()["id"]}
+    class_id = client.post("/classes", json=class_data).json()["id"]
+    for i in range(3):
+        client.post("/pupils", json={"first_name": f"P{i}", "last_name": "L", "class_id": class_id})
+
+    first = client.get(f"/pupils?class_id={class_id}&limit=2")
+    assert [p["first_name"] for p in first.json()] == ["P0", "P1"]
+    cursor = first.headers["x-next-cursor"]
+
+    second = client.get(f"/pupils?class_id={class_id}&limit=2&cursor={cursor}")
+    assert [p["first_name"] for p in second.json()] == ["P2"]
+    assert "x-next-cursor" not in second.headers
+
+
+def test_get_pupils_page_not_modified_keeps_paging_headers(client, sample_school_year,
+                                                            sample_class):
+    """Test that a 304 for a page still tells the client where the next page is."""
+    year_resp = client.post("/school_years", json=sample_school_year)
+    class_data = {**sample_class, "school_year_id": year_resp.json()["id"]}
+    class_id = client.post("/classes", json=class_data).json()["id"]
+    for i in range(3):
+        client.post("/pupils", json={"first_name": f"P{i}", "last_name": "L", "class_id": class_id})
+
+    first = client.get("/pupils?limit=2")
+    again = client.get("/pupils?limit=2", headers={"If-None-Match": first.headers["etag"]})
+    assert again.status_code == 304
+    assert again.headers["x-next-cursor"] == first.headers["x-next-cursor"]
+    assert again.headers["link"] == first.headers["link"]
+
+
+def create_named_pupils(client, sample_school_year, sample_class, names):
+    """Helper to create pupils from (first, last) names in two classes."""
+    year_id = client.post("/school_years", json=sample_school_year).json()["id"]
+    class_ids = [
+        client.post("/classes", json={**sample_class, "name": name,
+                                      "school_year_id": year_id}).json()["id"]
+        for name in ("1A", "1B")
+    ]
+    ids = {}
+    for i, (first, last) in enumerate(names):
+        ids[first] = client.post("/pupils", json={
+            "first_name": first, "last_name": last, "class_id": class_ids[i % 2]
+        }).json()["id"]
+    return class_ids, ids
+
+
+def test_search_pupils(client, sample_school_year, sample_class):
+    """Test typeahead search with prefixes, umlaut spellings and typos."""
+    class_ids, ids = create_named_pupils(client, sample_school_year, sample_class, [
+        ("Jörg", "Müller"), ("Max", "Mustermann"), ("Anna", "Schmidt"), ("Maxi", "Weiß"),
+    ])
+
+    def search(query):
+        return [p["id"] for p in client.get(f"/pupils/search?{query}").json()]
+
+    assert set(search("q=mu")[:2]) == {ids["Jörg"], ids["Max"]}
+    assert search("q=Mueller")[0] == ids["Jörg"]
+    assert search("q=müll")[0] == ids["Jörg"]
+    assert search("q=joerg m")[0] == ids["Jörg"]
+    assert search("q=Mustremann")[0] == ids["Max"]
+    assert search("q=weiss")[0] == ids["Maxi"]
+    assert search("q=max weiß")[0] == ids["Maxi"]
+    assert search(f"q=m&class_id={class_ids[0]}") == [ids["Jörg"]]
+    assert search("q=sch&limit=1") == [ids["Anna"]]
+
+
+def test_search_pupils_follows_renames(client, sample_school_year, sample_class):
+    """Test that the name index follows updates and deletes."""
+    class_ids, ids = create_named_pupils(client, sample_school_year, sample_class,
+                                         [("Max", "Mustermann")])
+    client.put(f"/pupils/{ids['Max']}", json={"first_name": "Max", "last_name": "Schulz",
+                                              "class_id": class_ids[0]})
+    assert [p["last_name"] for p in client.get("/pupils/search?q=schul").json()] == ["Schulz"]
+    client.delete(f"/pupils/{ids['Max']}")
+    assert client.get("/pupils/search?q=schul").json() == []
@@ -0,0 +1,176 @@
+"""Tests for the report rendering process pool."""
+import io
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import pytest
+from docx import Document
+from docx.oxml.ns import qn
+from reportlab.platypus import SimpleDocTemplate
+
+import routes.reports
+from services import rendering
+from services.pdf_generator import LazyStory, get_pdf_renderer
+from services.word_generator import get_word_renderer, generate_word_report
+
+
+@pytest.fixture
+def small_pool(monkeypatch):
+    """Run tests against a fresh single-worker pool without queue slack."""
+    rendering.shutdown_render_pool()
+    monkeypatch.setattr(rendering, "RENDER_WORKERS", 1)
+    monkeypatch.setattr(rendering, "RENDER_QUEUE_SIZE", 0)
+    monkeypatch.setattr(rendering, "RENDER_QUEUE_WAIT", 0)
+    yield
+    rendering.shutdown_render_pool()
+
+
+REPORT_DATA = {
+    "pupil_id": 1, "pupil_name": "Max Mustermann", "class_name": "1A",
+    "start_date": "2024-09-01", "end_date": "2025-07-31",
+    "entries_by_category": {"Test": [
+        {"date": "2024-10-01", "text": "Gut", "grade": "2", "subject": None}
+    ]},
+}
+
+
+def test_render_in_pool(small_pool):
+    """Test rendering a PDF in a worker process."""
+    assert rendering.render("pdf", REPORT_DATA).startswith(b"%PDF")
+
+
+def test_render_queue_is_bounded(small_pool):
+    """Test that submissions beyond the queue size are rejected."""
+    first = rendering.submit_render("pdf", REPORT_DATA)
+    with pytest.raises(rendering.RenderQueueFull):
+        rendering.submit_render("pdf", REPORT_DATA)
+    first.result()
+
+
+def test_render_timeout_in_worker(monkeypatch):
+    """Test that a render running past the timeout is aborted."""
+    monkeypatch.setattr(rendering, "RENDER_TIMEOUT", 1)
+    monkeypatch.setattr(rendering, "RENDERERS", {"slow": lambda data: time.sleep(5)})
+    monkeypatch.setattr(rendering, "_in_worker", True)
+    rendering.init_worker(memory_limit_mb=0)
+    started = time.monotonic()
+    with pytest.raises(rendering.RenderTimeout):
+        rendering.render_report("slow", REPORT_DATA)
+    assert time.monotonic() - started < 3
+
+
+def test_busy_renderer_returns_503(client, monkeypatch):
+    """Test that a full render queue is reported as 503 with Retry-After."""
+    def busy(fmt, data):
+        raise rendering.RenderQueueFull()
+    monkeypatch.setattr(routes.reports, "render", busy)
+    year_id = client.post("/school_years", json={
+        "name": "2024/2025", "start_date": "2024-09-01", "end_date": "2025-07-31"
+    }).json()["id"]
+    class_id = client.post("/classes", json={"name": "1A", "school_year_id": year_id}).json()["id"]
+    pupil_id = client.post("/pupils", json={
+        "first_name": "Max", "last_name": "Mustermann", "class_id": class_id
+    }).json()["id"]
+
+    response = client.get(f"/reports/pupil/{pupil_id}/pdf")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_busy_renderer_returns_503_for_class_zip(client, monkeypatch):
+    """Test that a full render queue fails a class archive before it starts streaming."""
+    def busy(fmt, data, queue_wait=None, path=None):
+        raise rendering.RenderQueueFull()
+    monkeypatch.setattr(rendering, "submit_render", busy)
+    year_id = client.post("/school_years", json={
+        "name": "2024/2025", "start_date": "2024-09-01", "end_date": "2025-07-31"
+    }).json()["id"]
+    class_id = client.post("/classes", json={"name": "1A", "school_year_id": year_id}).json()["id"]
+    client.post("/pupils", json={"first_name": "Max", "last_name": "Mustermann",
+                                 "class_id": class_id})
+
+    response = client.get(f"/reports/class/{class_id}/pdf")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_queued_render_is_not_timed_out(monkeypatch):
+    """Test that time spent waiting for a worker does not count towards the backstop."""
+    monkeypatch.setattr(rendering, "render_backstop", lambda: 0.2)
+    monkeypatch.setattr(rendering, "RENDER_POLL_INTERVAL", 0.01)
+    queued = Future()
+    threading.Timer(0.5, queued.set_result, [b"done"]).start()
+    assert rendering.wait_for_render(queued) == b"done"
+
+    running = Future()
+    running.set_running_or_notify_cancel()
+    with pytest.raises(rendering.RenderTimeout):
+        rendering.wait_for_render(running)
+
+
+def test_renderers_are_built_once():
+    """Test that styles and the DOCX template are shared between reports."""
+    assert get_pdf_renderer() is get_pdf_renderer()
+    assert get_word_renderer() is get_word_renderer()
+
+
+def test_word_template_is_not_modified():
+    """Test that rendering appends to a copy of the base template."""
+    renderer = get_word_renderer()
+    template = renderer.template
+    before = len(Document(io.BytesIO(template)).paragraphs)
+    first = Document(generate_word_report(REPORT_DATA))
+    second = Document(generate_word_report(REPORT_DATA))
+    assert renderer.template is template
+    assert len(Document(io.BytesIO(renderer.template)).paragraphs) == before == 0
+    assert len(first.paragraphs) == len(second.paragraphs) == 4
+    assert [p.style.name for p in first.paragraphs] == [
+        "Title", "Normal", "Heading 1", "List Bullet"
+    ]
+
+
+def test_word_template_has_no_dangling_style_references():
+    """Test that pruning unused styles leaves no references to the dropped ones."""
+    document = Document(io.BytesIO(get_word_renderer().template))
+    style_ids = {style.style_id for style in document.styles}
+    references = {
+        element.get(qn("w:val"))
+        for part in (document.styles.element, document.part.numbering_part.element)
+        for tag in ("w:basedOn", "w:next", "w:link", "w:pStyle")
+        for element in part.iter(qn(tag))
+    }
+    assert {"Title", "Heading1", "ListBullet", "TitleChar"} <= style_ids
+    assert references <= style_ids
+
+
+def test_long_pdf_keeps_few_flowables_alive(tmp_path):
+    """Test that long PDFs are built from a bounded window of flowables."""
+    renderer = get_pdf_renderer()
+    data = dict(REPORT_DATA, entries_by_category={
+        "Social": [{"date": "2024-01-01", "text": f"Entry {i}", "grade": None, "subject": None}
+                   for i in range(2000)]
+    })
+    alive = weakref.WeakSet()
+    peak = 0
+
+    def tracked():
+        nonlocal peak
+        for flowable in renderer.iter_story(data):
+            alive.add(flowable)
+            peak = max(peak, len(alive))
+            yield flowable
+
+    out = io.BytesIO()
+    SimpleDocTemplate(out).build(LazyStory(tracked()))
+    assert out.getvalue().startswith(b"%PDF")
+    assert peak < 50
+
+
+def test_render_to_file_in_pool(small_pool, tmp_path):
+    """Test that a worker can write a report straight to disk."""
+    path = str(tmp_path / "report.pdf")
+    assert rendering.render_to_file("pdf", REPORT_DATA, path) == path
+    with open(path, "rb") as f:
+        assert f.read(4) == b"%PDF"
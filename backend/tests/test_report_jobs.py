@@ -0,0 +1,148 @@
+"""Tests for background report job endpoints."""
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import ReportJob
+from services import jobs
+
+
+def create_class_with_pupils(client, count=2):
+    """Helper to create a class with pupils that each have one entry."""
+    year_id = client.post("/school_years", json={
+        "name": "2024/2025", "start_date": "2024-09-01", "end_date": "2025-07-31"
+    }).json()["id"]
+    class_id = client.post("/classes", json={"name": "1A", "school_year_id": year_id}).json()["id"]
+    cat_id = client.post("/categories", json={"name_de": "Test", "name_en": "Test"}).json()["id"]
+    pupil_ids = []
+    for i in range(count):
+        pupil_id = client.post("/pupils", json={
+            "first_name": f"Kind{i}", "last_name": "Muster", "class_id": class_id
+        }).json()["id"]
+        client.post("/entries", json={
+            "pupil_id": pupil_id, "category_id": cat_id, "date": "2024-10-01", "text": "Gut"
+        })
+        pupil_ids.append(pupil_id)
+    return class_id, pupil_ids
+
+
+def wait_for_job(client, job_id, timeout=60):
+    """Poll a job until it leaves the queued/running states."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/reports/jobs/{job_id}").json()
+        if job["status"] in (jobs.DONE, jobs.FAILED):
+            return job
+        time.sleep(0.05)
+    pytest.fail(f"Report job {job_id} did not finish")
+
+
+@pytest.fixture(autouse=True)
+def job_result_dir(tmp_path, monkeypatch):
+    """Write job results into a temporary directory."""
+    monkeypatch.setattr(jobs, "JOB_RESULT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_pupil_report_job(client):
+    """Test rendering a pupil PDF in the background and downloading it."""
+    _, pupil_ids = create_class_with_pupils(client, count=1)
+    response = client.post("/reports/jobs", json={"format": "pdf", "pupil_id": pupil_ids[0]})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "done"
+    assert job["progress"] == job["total"] == 1
+
+    result = client.get(f"/reports/jobs/{job_id}/result")
+    assert result.status_code == 200
+    assert result.headers["content-type"] == "application/pdf"
+    assert result.content.startswith(b"%PDF")
+
+
+def test_class_report_job(client):
+    """Test rendering a class archive in the background."""
+    class_id, _ = create_class_with_pupils(client, count=3)
+    job_id = client.post("/reports/jobs", json={"format": "docx", "class_id": class_id}).json()["id"]
+
+    job = wait_for_job(client, job_id)
+    assert job["status"] == "done"
+    assert job["progress"] == job["total"] == 3
+    result = client.get(f"/reports/jobs/{job_id}/result")
+    assert result.headers["content-type"] == "application/zip"
+
+
+def test_report_job_requires_one_target(client):
+    """Test that a job needs exactly one of pupil_id or class_id."""
+    response = client.post("/reports/jobs", json={"format": "pdf"})
+    assert response.status_code == 400
+
+
+def test_report_job_unknown_pupil(client):
+    """Test that a job for a non-existent pupil is rejected."""
+    response = client.post("/reports/jobs", json={"format": "pdf", "pupil_id": 999})
+    assert response.status_code == 404
+
+
+def test_report_job_not_found(client):
+    """Test status and result of an unknown job."""
+    assert client.get("/reports/jobs/unknown").status_code == 404
+    assert client.get("/reports/jobs/unknown/result").status_code == 404
+
+
+def test_result_of_unfinished_job(client, test_db):
+    """Test that downloading before completion returns 409."""
+    test_db.add(ReportJob(id="queuedjob", format="pdf", pupil_id=1, status=jobs.QUEUED))
+    test_db.commit()
+    assert client.get("/reports/jobs/queuedjob/result").status_code == 409
+
+
+def test_cleanup_expired_jobs(test_db, job_result_dir):
+    """Test that jobs past the TTL are deleted with their files."""
+    result = job_result_dir / "old.pdf"
+    result.write_bytes(b"%PDF")
+    test_db.add(ReportJob(id="old", format="pdf", status=jobs.DONE, result_path=str(result),
+                          created_at=datetime.utcnow() - jobs.JOB_RESULT_TTL - timedelta(minutes=1)))
+    test_db.add(ReportJob(id="new", format="pdf", status=jobs.DONE))
+    test_db.commit()
+
+    assert jobs.cleanup_expired_jobs(test_db) == 1
+    assert not result.exists()
+    assert [job.id for job in test_db.query(ReportJob).all()] == ["new"]
+
+
+def test_fail_interrupted_jobs(test_db):
+    """Test that only jobs without a recent heartbeat are failed on restart."""
+    now = datetime.utcnow()
+    stale = now - jobs.JOB_HEARTBEAT_TIMEOUT - timedelta(seconds=1)
+    test_db.add(ReportJob(id="orphaned", format="pdf", status=jobs.RUNNING,
+                          owner="gone", heartbeat_at=stale))
+    test_db.add(ReportJob(id="legacy", format="pdf", status=jobs.QUEUED))
+    test_db.add(ReportJob(id="sibling", format="pdf", status=jobs.RUNNING,
+                          owner="alive", heartbeat_at=now))
+    test_db.add(ReportJob(id="done", format="pdf", status=jobs.DONE, heartbeat_at=stale))
+    test_db.commit()
+
+    assert jobs.fail_interrupted_jobs(test_db, now) == 2
+    assert test_db.get(ReportJob, "orphaned").status == jobs.FAILED
+    assert test_db.get(ReportJob, "legacy").status == jobs.FAILED
+    assert test_db.get(ReportJob, "sibling").status == jobs.RUNNING
+    assert test_db.get(ReportJob, "done").status == jobs.DONE
+
+
+def test_heartbeat_keeps_own_jobs_alive(test_db):
+    """Test that a heartbeat refreshes this process's jobs only."""
+    stale = datetime.utcnow() - jobs.JOB_HEARTBEAT_TIMEOUT - timedelta(seconds=1)
+    test_db.add(ReportJob(id="mine", format="pdf", status=jobs.RUNNING,
+                          owner=jobs.JOB_OWNER, heartbeat_at=stale))
+    test_db.add(ReportJob(id="other", format="pdf", status=jobs.RUNNING,
+                          owner="gone", heartbeat_at=stale))
+    test_db.commit()
+
+    jobs.beat(lambda: test_db)
+    test_db.expire_all()
+    assert test_db.get(ReportJob, "mine").status == jobs.RUNNING
+    assert test_db.get(ReportJob, "mine").heartbeat_at > stale
+    assert test_db.get(ReportJob, "other").status == jobs.FAILED
@@ -1,6 +1,14 @@
 """Tests for reports API endpoints."""
+import io
+import os
+import zipfile
 from datetime import date, timedelta
 
+import pytest
+from sqlalchemy import event
+
+from models import Category, Entry
+
 
 def create_full_test_data(client):
     """Helper to create full test data with entries."""
@@ -93,3 +101,236 @@ def test_word_report_not_found(client):
     """Test Word report for non-existent pupil."""
     response = client.get("/reports/pupil/999/docx")
     assert response.status_code == 404
+
+
+def add_pupil_with_entry(client, class_id, cat_id, first_name):
+    """Helper to add another pupil with one entry to a class."""
+    pupil_id = client.post("/pupils", json={
+        "first_name": first_name, "last_name": "Muster", "class_id": class_id
+    }).json()["id"]
+    client.post("/entries", json={
+        "pupil_id": pupil_id, "category_id": cat_id,
+        "date": str(date.today()), "text": f"Entry for {first_name}"
+    })
+    return pupil_id
+
+
+def test_download_class_pdf_reports_zip(client):
+    """Test downloading a ZIP with one PDF per pupil of a class."""
+    pupil_id = create_full_test_data(client)
+    pupil = client.get(f"/pupils/{pupil_id}").json()
+    cat_id = client.get("/categories").json()[-1]["id"]
+    add_pupil_with_entry(client, pupil["class_id"], cat_id, "Erika")
+
+    response = client.get(f"/reports/class/{pupil['class_id']}/pdf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        names = archive.namelist()
+        assert len(names) == 2
+        assert all(name.endswith(".pdf") for name in names)
+        assert all(archive.read(name).startswith(b"%PDF") for name in names)
+
+
+def test_download_class_word_reports_zip(client):
+    """Test downloading a ZIP with one Word document per pupil."""
+    pupil_id = create_full_test_data(client)
+    class_id = client.get(f"/pupils/{pupil_id}").json()["class_id"]
+    response = client.get(f"/reports/class/{class_id}/docx")
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert [n.endswith(".docx") for n in archive.namelist()] == [True]
+
+
+def test_download_class_reports_with_non_ascii_class_name(client):
+    """Test that class names are encoded in the ZIP's Content-Disposition header."""
+    pupil_id = create_full_test_data(client)
+    class_id = client.get(f"/pupils/{pupil_id}").json()["class_id"]
+    class_ = client.get(f"/classes/{class_id}").json()
+    client.put(f"/classes/{class_id}", json={**class_, "name": "Klasse 1α; b"})
+
+    response = client.get(f"/reports/class/{class_id}/docx")
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == (
+        "attachment; filename*=utf-8''reports_Klasse%201%CE%B1%3B%20b_docx.zip"
+    )
+
+
+def test_download_merged_class_report(client, report_cache_dir):
+    """Test one cached PDF with a section per pupil of a class."""
+    pupil_id = create_full_test_data(client)
+    class_id = client.get(f"/pupils/{pupil_id}").json()["class_id"]
+    cat_id = client.get("/categories").json()[-1]["id"]
+    add_pupil_with_entry(client, class_id, cat_id, "Erika")
+
+    response = client.get(f"/reports/class/{class_id}/merged.pdf")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content.startswith(b"%PDF")
+    assert b"/Outlines" in response.content
+    assert client.get(f"/reports/class/{class_id}/merged.pdf").content == response.content
+    assert len(list(report_cache_dir.iterdir())) == 1
+
+    add_pupil_with_entry(client, class_id, cat_id, "Anna")
+    client.get(f"/reports/class/{class_id}/merged.pdf")
+    assert len(list(report_cache_dir.iterdir())) == 2
+
+
+def test_merged_class_report_not_found(client):
+    """Test merged class PDF for non-existent class."""
+    response = client.get("/reports/class/999/merged.pdf")
+    assert response.status_code == 404
+
+
+def test_class_reports_not_found(client):
+    """Test class report ZIP for non-existent class."""
+    response = client.get("/reports/class/999/pdf")
+    assert response.status_code == 404
+
+
+def test_pdf_report_served_from_cache(client, monkeypatch, report_cache_dir):
+    """Test that repeated downloads render the report only once."""
+    import routes.reports
+    calls = []
+    render = routes.reports.render
+    monkeypatch.setattr(routes.reports, "render",
+                        lambda fmt, data: calls.append(fmt) or render(fmt, data))
+    pupil_id = create_full_test_data(client)
+
+    first = client.get(f"/reports/pupil/{pupil_id}/pdf")
+    second = client.get(f"/reports/pupil/{pupil_id}/pdf")
+    assert first.content == second.content
+    assert calls == ["pdf"]
+    assert len(list(report_cache_dir.iterdir())) == 1
+
+
+def test_long_pdf_report_rendered_to_file(client, monkeypatch, report_cache_dir):
+    """Test that long reports are written to the cache by the worker."""
+    import routes.reports
+    monkeypatch.setattr(routes.reports, "LONG_REPORT_ENTRIES", 1)
+    monkeypatch.setattr(routes.reports, "render",
+                        lambda fmt, data: pytest.fail("rendered to bytes"))
+    pupil_id = create_full_test_data(client)
+
+    response = client.get(f"/reports/pupil/{pupil_id}/pdf")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert [p.suffix for p in report_cache_dir.iterdir()] == [".pdf"]
+
+
+def test_report_cache_invalidated_by_new_entry(client, report_cache_dir):
+    """Test that changing a pupil's entries produces a fresh report."""
+    pupil_id = create_full_test_data(client)
+    client.get(f"/reports/pupil/{pupil_id}/docx")
+
+    cat_id = client.get("/categories").json()[-1]["id"]
+    client.post("/entries", json={
+        "pupil_id": pupil_id, "category_id": cat_id,
+        "date": str(date.today()), "text": "Another entry"
+    })
+    client.get(f"/reports/pupil/{pupil_id}/docx")
+    assert len(list(report_cache_dir.iterdir())) == 2
+
+
+def test_report_cache_invalidated_by_category_rename(client, report_cache_dir):
+    """Test that renaming a category produces a fresh report."""
+    pupil_id = create_full_test_data(client)
+    client.get(f"/reports/pupil/{pupil_id}/pdf")
+
+    category = client.get("/categories").json()[-1]
+    client.put(f"/categories/{category['id']}", json={**category, "name_en": "Renamed"})
+    client.get(f"/reports/pupil/{pupil_id}/pdf")
+    assert len(list(report_cache_dir.iterdir())) == 2
+
+
+def test_report_cache_invalidated_by_reused_pupil_id(client, report_cache_dir):
+    """Test that a new pupil reusing a deleted pupil's id does not get its cached report."""
+    create_full_test_data(client)
+    class_id = client.get("/classes").json()[0]["id"]
+    pupil = {"first_name": "Erika", "last_name": "Muster", "class_id": class_id}
+    old_id = client.post("/pupils", json=pupil).json()["id"]
+    client.get(f"/reports/pupil/{old_id}/pdf")
+    client.delete(f"/pupils/{old_id}")
+
+    new_id = client.post("/pupils", json={**pupil, "first_name": "Paul"}).json()["id"]
+    assert new_id == old_id
+    client.get(f"/reports/pupil/{new_id}/pdf")
+    assert len(list(report_cache_dir.iterdir())) == 2
+
+
+def test_report_served_when_evicted_during_request(client, monkeypatch, report_cache_dir):
+    """Test that a report deleted by a concurrent eviction is still served."""
+    from services import report_cache
+
+    def evict_everything(keep=None, max_bytes=None):
+        for path in report_cache_dir.iterdir():
+            path.unlink()
+    monkeypatch.setattr(report_cache, "evict", evict_everything)
+    pupil_id = create_full_test_data(client)
+
+    response = client.get(f"/reports/pupil/{pupil_id}/pdf")
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert response.headers["content-disposition"] == 'attachment; filename="report_Mustermann_Max.pdf"'
+    assert list(report_cache_dir.iterdir()) == []
+
+
+def test_report_cache_evicts_least_recently_used(report_cache_dir, monkeypatch):
+    """Test that the cache stays under its size cap, dropping old files first."""
+    from services import report_cache
+    monkeypatch.setattr(report_cache, "REPORT_CACHE_MAX_BYTES", 250)
+
+    def store(key):
+        handle = report_cache.store_and_open(key, "pdf", report_cache.bytes_writer(b"x" * 100))
+        handle.close()
+        return report_cache.cache_path(key, "pdf")
+
+    def is_cached(key):
+        handle = report_cache.open_cached(key, "pdf")
+        if handle is None:
+            return False
+        handle.close()
+        return True
+
+    os.utime(store("a"), (1, 1))
+    os.utime(store("b"), (2, 2))
+    assert is_cached("a")
+    store("c")
+
+    assert is_cached("a")
+    assert not is_cached("b")
+    assert is_cached("c")
+
+
+def count_queries(engine):
+    """Return a list that collects every SQL statement run on engine."""
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_report_data_query_budget(client, test_db):
+    """Test that a 400-entry, 8-category report costs a single query."""
+    pupil_id = create_full_test_data(client)
+    categories = [Category(name_de=f"K{i}", name_en=f"C{i}") for i in range(8)]
+    test_db.add_all(categories)
+    test_db.flush()
+    test_db.add_all(
+        Entry(pupil_id=pupil_id, category_id=categories[i % 8].id,
+              date=date(2024, 9, 1) + timedelta(days=i % 200), text=f"Entry {i}")
+        for i in range(400)
+    )
+    test_db.commit()
+    test_db.expunge_all()
+
+    statements = count_queries(test_db.get_bind())
+    response = client.get(f"/reports/pupil/{pupil_id}")
+    assert response.status_code == 200
+    assert len(statements) == 1
+
+    entries_by_category = response.json()["entries_by_category"]
+    assert list(entries_by_category) == sorted(entries_by_category)
+    assert sum(len(entries) for entries in entries_by_category.values()) == 401
+    dates = [e["date"] for e in entries_by_category["C0"]]
+    assert dates == sorted(dates)
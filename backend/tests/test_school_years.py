@@ -64,3 +64,16 @@ def test_get_active_school_year(client, sample_school_year):
     response = client.get("/school_years/active")
     assert response.status_code == 200
     assert response.json()["is_active"] is True
+
+
+def test_school_year_cache_invalidated_on_write(client, sample_school_year):
+    """Test that cached school years reflect creates, updates and deletes."""
+    assert client.get("/school_years/active").status_code == 404
+    year_id = client.post("/school_years", json=sample_school_year).json()["id"]
+    assert client.get("/school_years/active").json()["id"] == year_id
+
+    client.put(f"/school_years/{year_id}", json={**sample_school_year, "name": "2025/2026"})
+    assert client.get("/school_years").json()[0]["name"] == "2025/2026"
+
+    client.delete(f"/school_years/{year_id}")
+    assert client.get(f"/school_years/{year_id}").status_code == 404